@@ -0,0 +1,109 @@
+"""
+토큰 검증 지연시간 비교 벤치마크
+
+    cd mcp && python bench/bench_auth.py [-n 2000]
+
+- remote (기존): 요청마다 requests.get(/auth/v1/user) — 로컬 스텁 서버라 실제보다 훨씬 빠른 하한값
+- local (cold): 캐시를 비운 상태에서 HS256 서명/만료/aud 로컬 검증
+- local (warm): 이미 검증한 토큰 캐시 적중
+
+실제 Supabase 로 remote 를 재려면 SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, BENCH_TOKEN 을 지정한다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class _StubAuthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"id": "00000000-0000-0000-0000-000000000000"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub() -> str:
+    server = HTTPServer(("127.0.0.1", 0), _StubAuthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def _report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<16} mean {statistics.mean(samples) * 1e6:10.1f}µs   "
+          f"p50 {statistics.median(samples) * 1e6:10.1f}µs   p95 {p95 * 1e6:10.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    real_remote = bool(os.getenv("BENCH_TOKEN") and os.getenv("SUPABASE_URL"))
+    if not real_remote:
+        os.environ["SUPABASE_URL"] = _start_stub()
+        os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+    os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret-" + "x" * 32)
+
+    import jwt
+    import requests
+    from services import auth
+
+    secret = os.environ["SUPABASE_JWT_SECRET"]
+    auth.SUPABASE_JWT_SECRET = secret
+    token = jwt.encode(
+        {"sub": "00000000-0000-0000-0000-000000000000", "aud": "authenticated",
+         "role": "authenticated", "exp": int(time.time()) + 3600},
+        secret,
+        algorithm="HS256",
+    )
+    remote_token = os.getenv("BENCH_TOKEN", token)
+    url = f"{os.environ['SUPABASE_URL']}/auth/v1/user"
+    headers = {"Authorization": f"Bearer {remote_token}", "apikey": os.environ["SUPABASE_SERVICE_ROLE_KEY"]}
+
+    # 기존 경로: 요청마다 blocking requests.get
+    remote_n = min(args.n, 200) if real_remote else args.n
+    remote = []
+    for _ in range(remote_n):
+        t0 = time.perf_counter()
+        requests.get(url, headers=headers, timeout=10)
+        remote.append(time.perf_counter() - t0)
+
+    async def run_local():
+        cold, warm = [], []
+        for _ in range(args.n):
+            auth._token_cache.clear()
+            t0 = time.perf_counter()
+            await auth.verify_token(token)
+            cold.append(time.perf_counter() - t0)
+        for _ in range(args.n):
+            t0 = time.perf_counter()
+            await auth.verify_token(token)
+            warm.append(time.perf_counter() - t0)
+        return cold, warm
+
+    cold, warm = asyncio.run(run_local())
+
+    print(f"n={args.n} ({'실제 Supabase' if real_remote else '로컬 스텁'} remote)")
+    _report("remote (기존)", remote)
+    _report("local (cold)", cold)
+    _report("local (warm)", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+리포트 퀴즈 통계 지연시간 벤치마크 (런 개수에 따른 변화)
+
+    cd mcp && python bench/bench_report.py [--runs 10,50,200,1000] [--latency-ms 5]
+
+- N+1 (기존): quiz_runs 1회 + 런마다 quiz_answers 1회
+- bulk: quiz_runs 1회 + session_id IN (...) 묶음 조회 (routes.report.get_quiz_summary)
+
+Supabase 대신 왕복마다 --latency-ms 만큼 지연되는 메모리 가짜 클라이언트(services.db 자리)를 쓴다.
+런 수가 늘어도 bulk 는 (세션 200개 / 답안 1000행 단위) 몇 번의 왕복으로 끝나고, 묶음끼리는 동시에 나간다.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+
+
+# ---------------- 가짜 Supabase (select 체인만) ----------------
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.filters = []
+        self.order_by = None
+        self.bounds = None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, col, value):
+        self.filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def in_(self, col, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(col) in values)
+        return self
+
+    def order(self, col, desc=False):
+        self.order_by = (col, desc)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    async def execute(self):
+        self.client.round_trips += 1
+        await asyncio.sleep(self.client.latency)
+        rows = [r for r in self.rows if all(f(r) for f in self.filters)]
+        if self.order_by:
+            col, desc = self.order_by
+            rows.sort(key=lambda r: r.get(col), reverse=desc)
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        return _Result(rows)
+
+
+class FakeSupabase:
+    def __init__(self, runs: int, answers_per_run: int, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+        self.user_id = str(uuid.uuid4())
+        self.tables = {"quiz_runs": [], "quiz_answers": []}
+        for i in range(runs):
+            session_id = str(uuid.uuid4())
+            self.tables["quiz_runs"].append(
+                {"id": str(uuid.uuid4()), "session_id": session_id, "user_id": self.user_id, "started_at": f"{i:08d}"}
+            )
+            for j in range(answers_per_run):
+                self.tables["quiz_answers"].append(
+                    {"id": f"{i:08d}-{j:02d}", "session_id": session_id, "is_correct": (i + j) % 3 != 0}
+                )
+
+    def from_(self, name):
+        return _Query(self, self.tables[name])
+
+
+# ---------------- 기존 방식 (비교용) ----------------
+async def _legacy_quiz_summary(client, user_uuid):
+    runs = (await (
+        client.from_("quiz_runs").select("id, session_id, started_at")
+        .eq("user_id", user_uuid).order("started_at", desc=False).execute()
+    )).data
+    out = []
+    for run in runs:
+        rows = (await client.from_("quiz_answers").select("is_correct").eq("session_id", run["session_id"]).execute()).data
+        correct = sum(1 for r in rows if r.get("is_correct") is True)
+        out.append((len(rows), correct))
+    return out
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", default="10,50,200,1000")
+    parser.add_argument("--answers", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from routes import report
+    from services import db
+
+    print(f"왕복 지연 {args.latency_ms:g}ms, 런당 답안 {args.answers}개")
+    print(f"{'runs':>6} | {'N+1 (ms)':>10} {'trips':>6} | {'bulk (ms)':>10} {'trips':>6}")
+    for n in [int(x) for x in args.runs.split(",")]:
+        client = FakeSupabase(n, args.answers, args.latency_ms / 1000)
+
+        t0 = time.perf_counter()
+        await _legacy_quiz_summary(client, client.user_id)
+        legacy_ms = (time.perf_counter() - t0) * 1000
+        legacy_trips, client.round_trips = client.round_trips, 0
+
+        db._client = client
+        t0 = time.perf_counter()
+        summary = await report.get_quiz_summary(client.user_id)
+        bulk_ms = (time.perf_counter() - t0) * 1000
+        assert summary["total_questions"] == n * args.answers
+
+        print(f"{n:>6} | {legacy_ms:>10.1f} {legacy_trips:>6} | {bulk_ms:>10.1f} {client.round_trips:>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
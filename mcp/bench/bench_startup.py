@@ -0,0 +1,136 @@
+"""
+콜드 스타트(앱 import) 시간 벤치마크
+
+    cd mcp && python bench/bench_startup.py [--repeat 5] [--top 15] [--save base.json] [--compare base.json]
+
+새 인터프리터에서 `python -X importtime -c "import main"` 을 --repeat 번 실행해 중앙값으로
+- main import 누적 시간 / 프로세스 전체 실행 시간
+- 누적 시간이 큰 모듈 상위 --top 개
+- 이 저장소 모듈(main, config, routes.*, services.*)별 누적 시간
+- 첫 사용으로 미뤄 둔 import(services.warmup.import_heavy)의 비용
+을 출력한다. --save 로 결과를 JSON 으로 남기고 --compare 로 이전 결과와의 차이(ms)를 본다.
+네트워크 없이 끝나도록 더미 Supabase/OpenAI 환경변수를 넣는다.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+OWN_MODULES = re.compile(r"^(main|config|routes(\..+)?|services(\..+)?)$")
+
+# main 을 불러온 뒤 첫 요청 때 생길 import 도 이어서 실행 (그 비용을 따로 집계)
+CHILD = "import main; from services import warmup; warmup.import_heavy()"
+
+
+def _run_once() -> Tuple[float, List[Tuple[str, int, int]]]:
+    """(프로세스 실행 시간 ms, [(모듈, 들여쓰기 깊이, 누적 us)])"""
+    env = dict(
+        os.environ,
+        SUPABASE_URL=os.getenv("SUPABASE_URL", "http://127.0.0.1:1"),
+        SUPABASE_SERVICE_ROLE_KEY=os.getenv("SUPABASE_SERVICE_ROLE_KEY", "bench"),
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"),
+        WARMUP_ON_STARTUP="0",
+    )
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            entries.append((m.group(4), len(m.group(3)) // 2, int(m.group(2))))
+    return wall_ms, entries
+
+
+def _summarize(entries: List[Tuple[str, int, int]]) -> Dict[str, float]:
+    """
+    모듈별 누적 시간(ms). 'main' 이후에 최상위로 찍힌 항목들의 합 = 첫 사용으로 미룬 import 비용
+    (이미 불러온 모듈은 다시 찍히지 않으므로 그대로 더하면 된다)
+    """
+    out: Dict[str, float] = {}
+    deferred = 0
+    seen_main = False
+    for name, depth, cumulative_us in entries:
+        out[name] = max(out.get(name, 0.0), cumulative_us / 1000)
+        if name == "main" and depth == 0:
+            seen_main = True
+        elif seen_main and depth == 0:
+            deferred += cumulative_us
+    out["<deferred>"] = deferred / 1000
+    return out
+
+
+def measure(repeat: int) -> Dict[str, object]:
+    _run_once()  # .pyc 생성 등 첫 실행 비용은 버림
+    walls, runs = [], []
+    for _ in range(repeat):
+        wall_ms, entries = _run_once()
+        walls.append(wall_ms)
+        runs.append(_summarize(entries))
+
+    modules = {}
+    for name in set().union(*runs):
+        modules[name] = round(statistics.median(r.get(name, 0.0) for r in runs), 2)
+    return {
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "wall_ms": round(statistics.median(walls), 2),
+        "main_ms": modules.get("main", 0.0),
+        "deferred_ms": modules.pop("<deferred>", 0.0),
+        "modules": modules,
+    }
+
+
+def _fmt_delta(now: float, before: float) -> str:
+    if before is None:
+        return ""
+    diff = now - before
+    return f"  ({'+' if diff >= 0 else ''}{diff:.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", help="결과를 JSON 으로 저장할 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과(JSON) 경로")
+    args = parser.parse_args()
+
+    result = measure(args.repeat)
+    base = json.loads(Path(args.compare).read_text()) if args.compare else None
+    base_modules = (base or {}).get("modules", {})
+
+    print(f"Python {result['python']}, 중앙값 ({args.repeat}회)")
+    for key, label in (("wall_ms", "프로세스 전체(미룬 것 포함)"), ("main_ms", "import main"), ("deferred_ms", "첫 사용으로 미룬 import")):
+        print(f"  {label:<22} {result[key]:>8.1f} ms{_fmt_delta(result[key], (base or {}).get(key))}")
+
+    modules = result["modules"]
+    print(f"\n누적 시간 상위 {args.top}개 (ms)")
+    for name, ms in sorted(modules.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {ms:>8.1f}  {name}{_fmt_delta(ms, base_modules.get(name))}")
+
+    print("\n저장소 모듈 (ms)")
+    own = [(n, ms) for n, ms in modules.items() if OWN_MODULES.match(n)]
+    for name, ms in sorted(own, key=lambda kv: -kv[1]):
+        print(f"  {ms:>8.1f}  {name}{_fmt_delta(ms, base_modules.get(name))}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"\n💾 저장: {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import os
-from supabase import create_client, Client
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -9,8 +8,11 @@ load_dotenv(env_path)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# JWT 로컬 검증용 (Supabase 대시보드 > API > JWT Secret). 없으면 JWKS → /auth/v1/user 순으로 대체
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 
 if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
     raise RuntimeError("환경변수 누락: SUPABASE_URL 또는 SUPABASE_SERVICE_ROLE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+# DB 접근은 services.db (앱 전역 비동기 PostgREST 클라이언트)
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -10,7 +12,43 @@ from routes.attendance import router as attendance_router
 # report 라우터 (지금부터 만들 기능)
 from routes.report import router as report_router
 
-app = FastAPI()
+# /metrics (Prometheus)
+from routes.metrics import router as metrics_router
+
+# /debug/profiles (요청 단위 프로파일 조회)
+from routes.profiles import router as profiles_router
+
+# 출석 write-behind 버퍼 / WebSocket 접속 추적
+from services.attendance_buffer import attendance_buffer
+from services.presence import presence
+from services import background, db, extractor, http, llm, warmup
+from services.metrics import MetricsMiddleware
+from services.profiling import ProfilingMiddleware
+from services.jobs import job_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await attendance_buffer.start()
+    await presence.start()
+    await job_queue.start()
+    # 무거운 의존성(openai 등)은 첫 사용 때 불러옴. 상시 실행 서버면 미리 데워 둘 수 있음
+    if warmup.ENABLED:
+        background.spawn(warmup.warm_up(), name="warmup")
+    yield
+    # 실행 중이던 작업은 running 으로 남아 다음 시작 때 다시 실행됨
+    # 종료 시 접속 중인 시간 → 버퍼 → DB 순서로 남은 값까지 반영
+    await job_queue.stop()
+    await presence.stop()
+    await attendance_buffer.stop()
+    await background.drain()
+    await db.aclose()
+    await llm.aclose()
+    await http.aclose()
+    extractor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 설정
 app.add_middleware(
@@ -25,6 +63,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# X-Debug-Profile 헤더가 있는 요청만 CPU 샘플링 + 단계 span 수집 (PROFILE_TOKEN 미설정이면 통과만)
+app.add_middleware(ProfilingMiddleware)
+# 라우트별 지연시간/상태 코드 (마지막에 추가 → 가장 바깥에서 CORS 까지 포함해 잰다)
+app.add_middleware(MetricsMiddleware)
 
 # 기존 라우터
 app.include_router(quiz.router, prefix="/api/quiz", tags=["quiz"])
@@ -36,6 +78,9 @@ app.include_router(attendance_router, prefix="/attendance", tags=["attendance"])
 # 📌 리포트 라우터 추가 (⭐ 지금부터 이거 쓰는 거!)
 app.include_router(report_router, prefix="/api/report", tags=["report"])
 
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(profiles_router, prefix="/debug/profiles", tags=["debug"])
+
 
 @app.get("/api")
 def root():
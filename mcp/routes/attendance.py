@@ -1,9 +1,45 @@
-from fastapi import APIRouter, HTTPException, Request
-from datetime import date
-from config import supabase
+
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+from services import kst
+from services.attendance_buffer import attendance_buffer, split_by_kst_day
+from services.auth import verify_token
+from services.kst import KST
+from services.presence import IDLE_GRACE, presence
 
 router = APIRouter()
 
+MAX_BATCH_ITEMS = 1000
+MAX_INTERVAL_SECONDS = 24 * 60 * 60
+
+
+# ---------------- 유틸 ----------------
+def _parse_ts(v) -> datetime:
+    """ISO 문자열 또는 epoch(초/밀리초)를 tz-aware datetime으로 변환 (tz 없으면 KST로 간주)"""
+    if isinstance(v, (int, float)):
+        # 밀리초 단위(JS Date.now())도 받아준다
+        if v > 1e11:
+            v = v / 1000
+        return datetime.fromtimestamp(v, tz=KST)
+    if isinstance(v, str):
+        dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+        return dt if dt.tzinfo else dt.replace(tzinfo=KST)
+    raise ValueError(f"잘못된 시각 값: {v!r}")
+
+
+def _merge_intervals(intervals: List[Tuple[datetime, datetime]]) -> List[Tuple[datetime, datetime]]:
+    """겹치거나 맞닿은 구간을 합쳐서 같은 시간이 두 번 집계되지 않게 한다"""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
 @router.post("/log")
 async def log_attendance(request: Request):
     body = await request.json()
@@ -14,46 +50,177 @@ async def log_attendance(request: Request):
     if not user_id:
         raise HTTPException(status_code=400, detail="user_id is required")
 
-    today = date.today().isoformat()
+    # bool 은 int 의 하위 타입이라 int(True) == 1 로 통과해 버리므로 따로 거절
+    if isinstance(delta, bool):
+        raise HTTPException(status_code=400, detail="seconds must be an integer")
+    try:
+        delta = int(delta)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="seconds must be an integer")
+    if not 0 <= delta <= MAX_INTERVAL_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_INTERVAL_SECONDS}")
+
+    # 배치/WebSocket 경로와 같은 KST 날짜 (서버 시간대와 무관)
+    today = kst.today().isoformat()
 
     try:
-        # 🔥 maybe_single() 제거하고 정상 동작하는 방식으로 변경
-        existing_res = (
-            supabase.table("attendance_logs")
-            .select("seconds, session_count")
-            .eq("user_id", user_id)
-            .eq("date", today)
-            .execute()
-        )
-
-        rows = existing_res.data or []
-        existing = rows[0] if rows else None
-
-        previous_seconds = existing.get("seconds", 0) if existing else 0
-        previous_sessions = existing.get("session_count", 0) if existing else 0
-
-        new_seconds = previous_seconds + delta
-
-        # 세션 카운트: 오늘 첫 기록이면 +1
-        new_session_count = previous_sessions
-        if previous_seconds == 0:
-            new_session_count += 1
-
-        supabase.table("attendance_logs").upsert(
-            {
-                "user_id": user_id,
-                "date": today,
-                "seconds": new_seconds,
-                "session_count": new_session_count,
-            },
-            on_conflict="user_id, date",
-        ).execute()
+        # 🔥 매 틱마다 SELECT + UPSERT 하지 않고 버퍼에 누적 → 주기적으로 일괄 upsert
+        totals = await attendance_buffer.add(user_id, today, delta)
 
         return {
             "success": True,
-            "seconds": new_seconds,
-            "session_count": new_session_count,
+            "seconds": totals["seconds"],
+            "session_count": totals["session_count"],
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/log/batch")
+async def log_attendance_batch(request: Request):
+    """
+    여러 건의 출석 기록을 한 번에 받는다 (오프라인 큐 flush 등).
+
+    {
+      "user_id": "...",                         # 각 항목에 user_id가 없을 때 기본값
+      "records":   [{"user_id", "date", "seconds"}],
+      "intervals": [{"user_id", "start", "end"}]  # ISO 문자열 또는 epoch
+    }
+
+    interval은 사용자별로 겹치는 구간을 합친 뒤 KST 자정 기준으로 나누고,
+    records와 함께 (user_id, date) 단위로 합쳐 한 번의 multi-row upsert로 저장한다.
+    """
+    body = await request.json()
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="body must be an object")
+    default_user = body.get("user_id")
+    records = body.get("records") or []
+    intervals = body.get("intervals") or []
+
+    if not isinstance(records, list) or not isinstance(intervals, list):
+        raise HTTPException(status_code=400, detail="records / intervals must be lists")
+    if not records and not intervals:
+        raise HTTPException(status_code=400, detail="records or intervals is required")
+    if len(records) + len(intervals) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"too many items (max {MAX_BATCH_ITEMS})")
+
+    deltas: Dict[Tuple[str, str], int] = {}
+
+    try:
+        for r in records:
+            if not isinstance(r, dict):
+                raise ValueError("records items must be objects")
+            user_id = r.get("user_id") or default_user
+            if not user_id:
+                raise ValueError("user_id is required")
+            day = date.fromisoformat(str(r.get("date") or kst.today().isoformat())).isoformat()
+            seconds = r.get("seconds", 0)
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float, str)):
+                raise ValueError("seconds must be a number")
+            seconds = int(seconds)
+            if not 0 <= seconds <= MAX_INTERVAL_SECONDS:
+                raise ValueError(f"seconds must be between 0 and {MAX_INTERVAL_SECONDS}")
+            deltas[(user_id, day)] = deltas.get((user_id, day), 0) + seconds
+
+        per_user: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        for it in intervals:
+            if not isinstance(it, dict):
+                raise ValueError("intervals items must be objects")
+            user_id = it.get("user_id") or default_user
+            if not user_id:
+                raise ValueError("user_id is required")
+            start, end = _parse_ts(it.get("start")), _parse_ts(it.get("end"))
+            if end <= start:
+                continue
+            if (end - start).total_seconds() > MAX_INTERVAL_SECONDS:
+                raise ValueError("interval is longer than 24h")
+            per_user.setdefault(user_id, []).append((start, end))
+
+        for user_id, spans in per_user.items():
+            for start, end in _merge_intervals(spans):
+                for day, seconds in split_by_kst_day(start, end).items():
+                    deltas[(user_id, day)] = deltas.get((user_id, day), 0) + seconds
+
+    except (TypeError, ValueError, OverflowError, OSError) as e:
+        # 잘못된 항목 하나로 500 이 나지 않게 (범위 밖 epoch / Infinity 포함)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # 버퍼를 거쳐야 /log 쪽 메모리 누적값과 어긋나지 않는다
+        totals = await attendance_buffer.add_many(deltas)
+        # 이 요청의 키만 바로 반영 (다른 사용자의 대기분은 주기 flush 몫)
+        await attendance_buffer.flush(only=totals.keys())
+
+        return {
+            "success": True,
+            "days": [
+                {
+                    "user_id": user_id,
+                    "date": day,
+                    "seconds": t["seconds"],
+                    "session_count": t["session_count"],
+                }
+                for (user_id, day), t in sorted(totals.items())
+            ],
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.websocket("/ws")
+async def presence_socket(websocket: WebSocket):
+    """
+    접속 상태 채널 (1초 HTTP 폴링 대체)
+
+    연결: /attendance/ws?token=<access token>[&user_id=...]
+      브라우저 WebSocket 은 헤더를 못 붙이므로 토큰은 쿼리로 받는다 (Authorization 헤더도 허용).
+      사용자는 토큰으로 정하고, user_id 를 같이 보내면 토큰의 사용자와 같아야 한다.
+    클라이언트 → {"type": "ping", "active": true|false}   (탭이 보이면 active=true)
+    서버 → {"type": "pong"}
+
+    연결/종료 시점이 곧 세션 경계이고, ping 이 IDLE_GRACE 동안 없으면 자리 비움으로 본다.
+    """
+    authorization = websocket.headers.get("authorization") or ""
+    token = websocket.query_params.get("token") or (
+        authorization.split(" ", 1)[1] if authorization.startswith("Bearer ") else None
+    )
+    if not token:
+        await websocket.close(code=1008, reason="token is required")
+        return
+    try:
+        # HTTP 라우트(get_current_user)와 같은 검증
+        user = await verify_token(token)
+    except HTTPException as e:
+        await websocket.close(code=1008 if e.status_code == 401 else 1011, reason=str(e.detail))
+        return
+
+    user_id = user["id"]
+    requested = websocket.query_params.get("user_id")
+    if requested and requested != user_id:
+        await websocket.close(code=1008, reason="user_id does not match token")
+        return
+
+    await websocket.accept()
+    session = None
+
+    try:
+        session = await presence.connect(user_id)
+        while True:
+            try:
+                # 죽은 연결이 남지 않도록 ping 이 한동안 없으면 끊는다
+                msg = await asyncio.wait_for(websocket.receive_json(), timeout=IDLE_GRACE * 2)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1001, reason="ping timeout")
+                break
+
+            if isinstance(msg, dict) and msg.get("type") == "ping":
+                presence.ping(session, active=bool(msg.get("active", True)))
+                await websocket.send_json({"type": "pong"})
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if session is not None:
+            presence.disconnect(session)
@@ -1,16 +1,59 @@
 from fastapi import APIRouter, Request
-from openai import OpenAI
-from dotenv import load_dotenv
-import os
+from fastapi.responses import StreamingResponse
+from services import llm, sse
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 router = APIRouter()
 
+SYSTEM_PROMPT = (
+    "너는 학습 도우미 챗봇이야. "
+    "사용자가 퀴즈 제작, 학습 요약, 질문 만들기 등을 물어보면 "
+    "핵심만 간결하게, 따뜻하게 대답해줘."
+)
+
+
+def _build_messages(user_message: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
+
+
+def _stream_reply(req: Request, user_message: str) -> StreamingResponse:
+    """
+    토큰이 도착하는 대로 SSE 로 전달
+      data: {"delta": "..."}        (여러 번)
+      event: done  / data: {"reply": 전체 답변}
+      event: error / data: {"error": "..."}
+    """
+    async def events():
+        parts = []
+        stream = llm.stream_chat_completion("gpt-4o-mini", _build_messages(user_message), timeout=60)
+        try:
+            async for delta in stream:
+                # 클라이언트가 떠났으면 더 생성하지 않고 upstream 요청도 닫는다
+                if await req.is_disconnected():
+                    break
+                parts.append(delta)
+                yield sse.event({"delta": delta})
+            else:
+                yield sse.event({"reply": "".join(parts)}, "done")
+        except Exception as e:
+            yield sse.event({"error": str(e) or e.__class__.__name__}, "error")
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/")  # ✅ prefix="/api/chat" 과 결합되어 /api/chat/ 이 최종 경로가 됨
 async def chat(req: Request):
     """
     학습/퀴즈/자료 기반 도우미 챗봇
+    Accept: text/event-stream 이면 스트리밍(SSE)으로 응답
     """
     data = await req.json()
     user_message = data.get("message", "")
@@ -18,20 +61,26 @@ async def chat(req: Request):
     if not user_message:
         return {"error": "message 필드가 비어 있습니다."}
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "너는 학습 도우미 챗봇이야. "
-                    "사용자가 퀴즈 제작, 학습 요약, 질문 만들기 등을 물어보면 "
-                    "핵심만 간결하게, 따뜻하게 대답해줘."
-                ),
-            },
-            {"role": "user", "content": user_message},
-        ],
+    if "text/event-stream" in req.headers.get("accept", ""):
+        return _stream_reply(req, user_message)
+
+    response = await llm.chat_completion(
+        "gpt-4o-mini",
+        _build_messages(user_message),
+        timeout=30,
     )
 
     reply = response.choices[0].message.content
     return {"reply": reply}
+
+
+@router.post("/stream")
+async def chat_stream(req: Request):
+    """/api/chat/ 의 스트리밍 전용 버전 (Accept 헤더를 못 바꾸는 클라이언트용)"""
+    data = await req.json()
+    user_message = data.get("message", "")
+
+    if not user_message:
+        return {"error": "message 필드가 비어 있습니다."}
+
+    return _stream_reply(req, user_message)
@@ -0,0 +1,20 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from services import metrics
+
+router = APIRouter()
+
+# 설정하면 Authorization: Bearer <토큰> 이 있어야 조회 가능 (공개 배포에서 지표 노출 방지)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: str = Header(None)):
+    """Prometheus 텍스트 형식 지표 (라우트별 지연/상태, Supabase·OpenAI·다운로드 호출, 토큰, 퀴즈 단계)"""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="인증 필요")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from services import profiling
+
+router = APIRouter()
+
+
+def _check(token: str) -> None:
+    # PROFILE_TOKEN 이 없으면 기능 자체가 없는 것처럼 404
+    if not profiling.TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.authorized(token):
+        raise HTTPException(status_code=401, detail="인증 필요")
+
+
+@router.get("/{profile_id}", include_in_schema=False)
+async def get_profile(profile_id: str, x_debug_profile: str = Header(None)):
+    """요청 요약 + span 트리(JSON). 응답 헤더 X-Profile-Id 로 받은 id 를 넣는다"""
+    _check(x_debug_profile)
+    path = profiling.artifact_path(profile_id, "json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="프로파일 없음")
+    return FileResponse(path, media_type="application/json")
+
+
+@router.get("/{profile_id}/{kind}", include_in_schema=False)
+async def get_artifact(profile_id: str, kind: str, x_debug_profile: str = Header(None)):
+    """
+    folded stack 텍스트 (flamegraph.pl / speedscope 에 그대로)
+      cpu.folded   : 이벤트 루프 스레드 샘플링 (값 = 샘플 수)
+      spans.folded : 단계·외부 호출 span 트리 (값 = 자기 시간 ms)
+    """
+    _check(x_debug_profile)
+    path = profiling.artifact_path(profile_id, kind)
+    if path is None or kind == "json":
+        raise HTTPException(status_code=404, detail="프로파일 없음")
+    return PlainTextResponse(path.read_text(), media_type="text/plain; charset=utf-8")
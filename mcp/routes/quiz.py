@@ -1,56 +1,30 @@
-from fastapi import APIRouter, Request, Header, HTTPException
-from fastapi.responses import JSONResponse
-import os, json, httpx, requests
-from io import BytesIO
-from datetime import datetime, timedelta, timezone
-from typing import Tuple
-from dotenv import load_dotenv
-from openai import OpenAI
-from PyPDF2 import PdfReader
-from pptx import Presentation
-from supabase import create_client, Client
-from pathlib import Path
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio, json, uuid
+from datetime import datetime
+from config import OPENAI_API_KEY
+from services import answer_keys, background, condense, db, identity, llm, materials, metrics, profiling, question_bank, sse
+from services.auth import get_current_user
+from services.jobs import JobError, job_queue
+from services.json_stream import JsonArrayStream
+from services.kst import KST
+from services.report_cache import report_cache
 
 # ---------------- 초기 설정 ----------------
-load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
+# .env 로드와 Supabase 설정 검사는 config 에서 (한 번만)
+if not OPENAI_API_KEY:
+    raise RuntimeError("환경변수 누락: OPENAI_API_KEY")
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-if not (OPENAI_API_KEY and SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY):
-    raise RuntimeError("환경변수 누락: OPENAI_API_KEY / SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 router = APIRouter()
-MAX_TOTAL_CHARS = 18000
-KST = timezone(timedelta(hours=9))
+# 긴 자료는 services.condense 가 토큰 예산 안으로 줄여서 넘기므로 이 값은 최종 안전장치
+MAX_TOTAL_CHARS = 40000
+QUIZ_SIZE = 3
 
 # ---------------- 유틸 ----------------
 def _safe_cut(text: str, limit: int) -> str:
     return (text or "").strip()[:limit]
 
-async def _download_file(url: str) -> Tuple[str, bytes]:
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as http:
-        r = await http.get(url)
-    if r.status_code != 200:
-        raise RuntimeError(f"다운로드 실패({r.status_code})")
-    return url.split("/")[-1].lower(), r.content
-
-def _extract_text_from_pdf(content: bytes) -> str:
-    reader = PdfReader(BytesIO(content))
-    return "\n".join([page.extract_text() or "" for page in reader.pages])
-
-def _extract_text_from_pptx(content: bytes) -> str:
-    prs = Presentation(BytesIO(content))
-    slides = []
-    for slide in prs.slides:
-        texts = [s.text for s in slide.shapes if hasattr(s, "text") and s.text]
-        slides.append("\n".join(texts))
-    return "\n".join(slides)
-
-def _build_prompt(all_text: str, mode: str) -> str:
+def _build_prompt(all_text: str, mode: str, count: int = QUIZ_SIZE) -> str:
     mode_map = {
         "ox": "OX 형식 문제 (정답은 O 또는 X)",
         "short": "서술형 문제 (짧은 한 문장으로 답변)",
@@ -59,7 +33,7 @@ def _build_prompt(all_text: str, mode: str) -> str:
     }
     return f"""
 다음은 강의 자료의 통합 텍스트입니다.
-이 내용을 바탕으로 학습 이해도를 평가할 수 있는 {mode_map.get(mode, "혼합형 문제")} 3문항을 만들어 주세요.
+이 내용을 바탕으로 학습 이해도를 평가할 수 있는 {mode_map.get(mode, "혼합형 문제")} {count}문항을 만들어 주세요.
 
 요구사항:
 1) JSON 배열만 출력
@@ -72,48 +46,91 @@ def _build_prompt(all_text: str, mode: str) -> str:
 -----
 """
 
-# ---------------- Supabase 토큰 검증 ----------------
-def verify_supabase_token(token: str):
-    url = f"{SUPABASE_URL}/auth/v1/user"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "apikey": SUPABASE_SERVICE_ROLE_KEY,  # Render에서도 동작하게
-    }
+def _normalize_questions(quiz_data) -> list:
+    questions = []
+    for q in quiz_data:
+        answer = (q.get("answer") or q.get("correct_answer") or "").strip()
+        explanation = (q.get("explanation") or "").strip()
+        choices = q.get("choices") or q.get("options") or []
+
+        cleaned = []
+        for c in choices:
+            if isinstance(c, str):
+                cleaned.append(
+                    c.replace("A. ", "")
+                     .replace("B. ", "")
+                     .replace("C. ", "")
+                     .replace("D. ", "")
+                     .strip()
+                )
+            else:
+                cleaned.append(c)
+
+        questions.append({
+            "question": q.get("question", "").strip(),
+            "choices": cleaned,
+            "answer": answer,
+            "explanation": explanation,
+        })
+    return questions
+
+async def _generate_questions(all_text: str, mode: str, count: int = QUIZ_SIZE) -> list:
+    with profiling.span("prompt.build"):
+        prompt = _build_prompt(all_text, mode, count)
+    resp = await llm.chat_completion(
+        "gpt-4o-mini",
+        [
+            {"role": "system", "content": "너는 교육용 퀴즈를 JSON으로만 반환하는 AI 교사야."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+        timeout=90,
+    )
+    quiz_text = resp.choices[0].message.content
+    json_str = quiz_text[quiz_text.find("["):quiz_text.rfind("]") + 1]
+    return _normalize_questions(json.loads(json_str))
+
+async def _stream_questions(all_text: str, mode: str, count: int = QUIZ_SIZE):
+    """stream=True 로 받으면서 JSON 배열 원소가 하나 완성될 때마다 정규화된 문항을 yield"""
+    parser = JsonArrayStream()
+    with profiling.span("prompt.build"):
+        prompt = _build_prompt(all_text, mode, count)
+    stream = llm.stream_chat_completion(
+        "gpt-4o-mini",
+        [
+            {"role": "system", "content": "너는 교육용 퀴즈를 JSON으로만 반환하는 AI 교사야."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+        timeout=90,
+    )
     try:
-        res = requests.get(url, headers=headers, timeout=10)
-        if res.status_code == 200:
-            print("✅ Supabase 인증 성공")
-            return res.json()
-        print(f"❌ Supabase 인증 실패: {res.status_code} {res.text}")
-        raise HTTPException(status_code=401, detail="Supabase 인증 실패")
-    except requests.exceptions.RequestException as e:
-        print("🚨 Supabase API 연결 실패:", e)
-        raise HTTPException(status_code=500, detail="Supabase 연결 실패")
+        async for delta in stream:
+            # 배열이 닫힌 뒤에는 코드펜스와 usage 청크 정도만 남으므로 끝까지 받아 토큰을 집계
+            for item in parser.feed(delta):
+                yield _normalize_questions([item])[0]
+    finally:
+        await stream.aclose()
+
+async def _generate_from_docs(docs: list, mode: str, count: int = QUIZ_SIZE) -> list:
+    # 요약은 조각 단위로 캐시되므로 같은 자료면 LLM 요약 호출 없이 바로 합본이 나옴
+    return await _generate_questions(await condense.condense(docs), mode, count)
 
 # ---------------- 세션 & 실행(run) 생성 (항상 새로운 세션) ----------------
 @router.post("/session/start")
-async def start_quiz_session(req: Request, authorization: str = Header(None)):
+async def start_quiz_session(req: Request, user: dict = Depends(get_current_user)):
     data = await req.json()
     room_id = data.get("room_id")
     week_id = data.get("post_id")
     mode = data.get("mode", "mixed")
 
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="인증 토큰이 없습니다.")
-
-    token = authorization.split(" ")[1]
-
-    # 🔐 유저 인증
-    try:
-        user_data = verify_supabase_token(token)
-        user_id = user_data["id"]
-        print(f"🧩 인증된 사용자: {user_id}")
-    except:
-        raise
+    # 🔐 유저 인증 (로컬 JWT 검증, get_current_user)
+    user_id = user["id"]
+    print(f"🧩 인증된 사용자: {user_id}")
 
     try:
         # ❗ 항상 새로운 세션 생성
-        s_res = supabase.table("quiz_sessions").insert({
+        s_res = await db.quiz_sessions().insert({
             "user_id": user_id,
             "lecture_id": room_id,
             "week_id": week_id,
@@ -128,7 +145,7 @@ async def start_quiz_session(req: Request, authorization: str = Header(None)):
         session_id = s_res.data[0]["id"]
 
         # 새 run 생성
-        r_res = supabase.table("quiz_runs").insert({
+        r_res = await db.quiz_runs().insert({
             "session_id": session_id,
             "user_id": user_id,
             "lecture_id": room_id,
@@ -141,6 +158,7 @@ async def start_quiz_session(req: Request, authorization: str = Header(None)):
             raise RuntimeError("런 생성 실패")
 
         run_id = r_res.data[0]["id"]
+        report_cache.bump(user_id)
 
         print(f"🆕 새 세션/런 생성 완료: session={session_id}, run={run_id}")
         return JSONResponse({"session_id": session_id, "run_id": run_id})
@@ -151,24 +169,15 @@ async def start_quiz_session(req: Request, authorization: str = Header(None)):
 
 # ---------------- 실행(run)만 생성 (기존 세션 재도전용) ----------------
 @router.post("/run/start")
-async def start_quiz_run(req: Request, authorization: str = Header(None)):
+async def start_quiz_run(req: Request, user: dict = Depends(get_current_user)):
     """
     기존 session_id를 받아서 그 세션에 속한 새 run만 생성.
     - session_id는 그대로
     - quiz_runs에만 새로운 row 추가
     """
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="인증 토큰이 없습니다.")
-
-    token = authorization.split(" ")[1]
-
-    # 🔐 유저 인증
-    try:
-        user_data = verify_supabase_token(token)
-        user_id = user_data["id"]
-        print(f"🧩 인증된 사용자(재도전 run): {user_id}")
-    except:
-        raise
+    # 🔐 유저 인증 (로컬 JWT 검증, get_current_user)
+    user_id = user["id"]
+    print(f"🧩 인증된 사용자(재도전 run): {user_id}")
 
     try:
         data = await req.json()
@@ -181,8 +190,8 @@ async def start_quiz_run(req: Request, authorization: str = Header(None)):
             )
 
         # 기존 세션 정보 조회 (lecture_id, week_id, mode 재사용)
-        s_res = (
-            supabase.table("quiz_sessions")
+        s_res = await (
+            db.quiz_sessions()
             .select("lecture_id, week_id, mode")
             .eq("id", session_id)
             .limit(1)
@@ -201,8 +210,8 @@ async def start_quiz_run(req: Request, authorization: str = Header(None)):
         mode = session.get("mode") or "mixed"
 
         # 새 run 생성
-        r_res = (
-            supabase.table("quiz_runs")
+        r_res = await (
+            db.quiz_runs()
             .insert({
                 "session_id": session_id,
                 "user_id": user_id,
@@ -219,6 +228,7 @@ async def start_quiz_run(req: Request, authorization: str = Header(None)):
             raise RuntimeError("런 생성 실패")
 
         run_id = r_res.data[0]["id"]
+        report_cache.bump(user_id)
         print(f"🔁 기존 세션에 새 런 생성: session={session_id}, run={run_id}")
 
         return JSONResponse({"session_id": session_id, "run_id": run_id})
@@ -228,109 +238,371 @@ async def start_quiz_run(req: Request, authorization: str = Header(None)):
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 # ---------------- 퀴즈 생성 ----------------
-@router.post("/from-url")
-async def generate_quiz_from_url(req: Request):
-    data = await req.json()
+async def _no_stage(stage: str) -> None:
+    return None
+
+async def _insert_questions(generated: list, session_id, save_key: str = None, start: int = 0) -> list:
+    """start: 런 안에서 첫 문항의 순번 (스트리밍처럼 한 문항씩 저장할 때)"""
+    questions = [dict(q, session_id=session_id) for q in generated]
+    if save_key is None:
+        return (await db.quiz_questions().insert(questions).execute()).data
+    # 같은 키(런/작업)로 다시 저장하면 같은 id → 작업이 재실행돼도 문항이 중복으로 쌓이지 않음
+    # (quiz_questions.id 가 uuid primary key 라는 전제. .sql.txt 참고)
+    for i, q in enumerate(questions, start):
+        q["id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"sturoom:quiz:{save_key}:{i}"))
+    return (await db.quiz_questions().upsert(questions, on_conflict="id").execute()).data
+
+async def _quiz_message_exists(session_id, run_id) -> bool:
+    res = await (
+        db.quiz_messages().select("id")
+        .eq("session_id", session_id).eq("run_id", run_id).eq("kind", "quiz")
+        .limit(1).execute()
+    )
+    return bool(res.data)
+
+async def _finish_quiz(rows: list, session_id, run_id, user_id, idempotent: bool = False) -> None:
+    # 세션/런 quiz_count 업데이트 + 첫 문제 메시지 저장 (전체 퀴즈 목록 payload로) → 서로 독립이라 동시에
+    writes = [
+        db.quiz_runs().update({"quiz_count": len(rows)}).eq("id", run_id).execute(),
+        db.quiz_sessions().update({"quiz_count": len(rows)}).eq("id", session_id).execute(),
+    ]
+    # 재실행이면 이 런의 퀴즈 메시지가 이미 있을 수 있음 (카운트 갱신은 같은 값이라 그대로)
+    if not (idempotent and run_id and await _quiz_message_exists(session_id, run_id)):
+        writes.append(db.quiz_messages().insert({
+            "session_id": session_id,
+            "run_id": run_id,
+            "user_id": user_id,
+            "role": "ai",
+            "kind": "quiz",
+            "payload": json.dumps({"quiz": rows}),
+        }).execute())
+    await asyncio.gather(*writes)
+
+async def _save_quiz(generated: list, session_id, run_id, user_id, save_key: str = None) -> list:
+    """save_key(런 id 또는 작업 id)를 주면 같은 키로 다시 저장해도 행이 늘지 않는다"""
+    rows = await _insert_questions(generated, session_id, save_key)
+    await _finish_quiz(rows, session_id, run_id, user_id, idempotent=save_key is not None)
+    return rows
+
+async def _load_docs(file_urls: list):
+    """자료 URL 목록 → ([(파일명, 텍스트)], 실패 목록). 하나도 못 읽으면 JobError(502)"""
+    # 파일 내용 합치기 (동시에 받고, 같은 자료는 캐시에서 바로)
+    urls = [file.get("url") if isinstance(file, dict) else file for file in file_urls]
+    docs = []
+    failed_files = []
+    loaded = await materials.load_many([u for u in urls if u])
+    for res in loaded:
+        if "error" in res:
+            print(f"⚠ 파일 처리 실패: {res['url']} ({res['error']})")
+            failed_files.append({"url": res["url"], "error": res["error"]})
+        else:
+            docs.append((res["fname"], res["text"]))
+
+    if not docs:
+        raise JobError(502, {"error": "자료를 불러오지 못했습니다.", "failed_files": failed_files})
+    return docs, failed_files
+
+async def _take_from_bank(docs: list, mode: str, use_bank: bool):
+    """(fingerprint, 은행에서 꺼낸 문항 | None, 사용 가능한 문항 수)"""
+    fp = question_bank.fingerprint([text for _, text in docs])
+    picked, available = (None, 0)
+    if use_bank:
+        try:
+            picked, available = await question_bank.take(fp, mode, QUIZ_SIZE)
+        except Exception as e:
+            print(f"⚠ 문제 은행 조회 실패: {e}")
+    if picked is not None:
+        print(f"🏦 문제 은행에서 출제: mode={mode} (남은 문항 {available})")
+    return fp, picked, available
+
+def _bank_after_generate(fp: str, docs: list, mode: str, generated: list, available: int, use_bank: bool) -> None:
+    if not use_bank:
+        return
+    if generated:
+        # 방금 만든 문항도 다음 학생을 위해 적립 (이미 1번 출제됨)
+        background.spawn(question_bank.add(fp, mode, generated, served=1), name="quiz_bank.add")
+        available += len(generated)
+    question_bank.ensure_stock(
+        fp, mode, available,
+        lambda: _generate_from_docs(docs, mode, question_bank.REFILL_COUNT),
+    )
+
+async def _quiz_from_url(data: dict, stage=_no_stage) -> dict:
+    """
+    자료 로드 → 문항 생성(은행/LLM) → 저장 파이프라인.
+    요청 안에서 바로 실행하거나 작업 큐 워커에서 실행하며, 단계가 바뀔 때마다 stage() 로 알린다.
+    실패는 JobError(status, content) 로 올린다.
+    """
     file_urls = data.get("file_urls") or []
     mode = (data.get("mode") or "mixed").strip().lower()
     user_id = data.get("user_id")
-    room_id = data.get("room_id")
-    week_id = data.get("week_id")
     session_id = data.get("session_id")
     run_id = data.get("run_id")
 
-    if not file_urls:
-        return JSONResponse(status_code=400, content={"error": "file_urls가 없습니다."})
+    # 단계별 소요 시간 → pipeline_stage_duration_seconds{pipeline="quiz"}
+    timer = metrics.StageTimer("quiz")
 
-    # 파일 내용 합치기
-    aggregated = []
-    for file in file_urls:
+    async def enter(name: str) -> None:
+        timer.enter(name)
+        await stage(name)
+
+    try:
+        await enter("loading")
+        docs, failed_files = await _load_docs(file_urls)
+
+        # 문제 은행: 같은 자료·모드로 미리 만들어 둔 문항이 있으면 LLM 호출 없이 바로 출제
+        use_bank = data.get("use_bank", True)
+        timer.enter("bank")
+        fp, picked, available = await _take_from_bank(docs, mode, use_bank)
+
+        if picked is not None:
+            generated = picked
+            _bank_after_generate(fp, docs, mode, [], available, use_bank)
+        else:
+            # AI 호출 (은행 미스). 긴 자료는 조각별 병렬 요약 → 합본으로 전체 범위를 반영
+            try:
+                await enter("condensing")
+                all_text = await condense.condense(docs)
+                await enter("generating")
+                generated = await _generate_questions(all_text, mode)
+            except Exception as e:
+                raise JobError(500, {"error": f"OpenAI 처리 실패: {str(e)}"})
+            _bank_after_generate(fp, docs, mode, generated, available, use_bank)
+
+        # Supabase 저장
+        await enter("saving")
         try:
-            url = file.get("url") if isinstance(file, dict) else file
-            fname, blob = await _download_file(url)
-            text = _extract_text_from_pdf(blob) if fname.endswith(".pdf") else _extract_text_from_pptx(blob)
-            aggregated.append(f"\n### {fname}\n{text}")
+            job_id = data.get("job_id")
+            if job_id:
+                # 큐 작업은 lease 가 만료되면 다른 워커가 처음부터 다시 실행함 → 같은 행을 쓰도록 키 지정
+                save_key = run_id or job_id
+            else:
+                # 동기 요청(/from-url)은 서버가 다시 실행하는 일이 없으므로 키 없이 insert
+                # (run_id 없이 오는 요청도 있어 고정할 키가 없음)
+                save_key = None
+            inserted = await _save_quiz(generated, session_id, run_id, user_id, save_key)
         except Exception as e:
-            print(f"⚠ 파일 처리 실패: {url} ({e})")
+            raise JobError(500, {"error": str(e)})
+        # 채점 때 DB 를 다시 읽지 않도록 세션 정답표 캐시
+        answer_keys.remember(session_id, inserted)
 
-    all_text = "\n".join(aggregated)
-    prompt = _build_prompt(all_text, mode)
+        return {
+            "message": "퀴즈 생성 완료",
+            "session_id": session_id,
+            "run_id": run_id,
+            "quiz_count": len(inserted),
+            "quiz": inserted,
+            "failed_files": failed_files,
+        }
+    finally:
+        timer.close()
 
-    # AI 호출
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "너는 교육용 퀴즈를 JSON으로만 반환하는 AI 교사야."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.2,
-        )
-        quiz_text = resp.choices[0].message.content
-        json_str = quiz_text[quiz_text.find("["):quiz_text.rfind("]") + 1]
-        quiz_data = json.loads(json_str)
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": f"OpenAI 처리 실패: {str(e)}"})
+job_queue.register("quiz.from_url", _quiz_from_url)
 
-    # Supabase 저장
-    try:
-        questions = []
-        for q in quiz_data:
-            answer = (q.get("answer") or q.get("correct_answer") or "").strip()
-            explanation = (q.get("explanation") or "").strip()
-            choices = q.get("choices") or q.get("options") or []
-
-            cleaned = []
-            for c in choices:
-                if isinstance(c, str):
-                    cleaned.append(
-                        c.replace("A. ", "")
-                         .replace("B. ", "")
-                         .replace("C. ", "")
-                         .replace("D. ", "")
-                         .strip()
-                    )
-                else:
-                    cleaned.append(c)
-
-            questions.append({
+def _stream_quiz(req: Request, data: dict) -> StreamingResponse:
+    """
+    문항이 완성되는 대로 저장하고 SSE 로 전달
+      event: stage    / data: {"stage": "loading" | "condensing" | "generating"}
+      event: question / data: {"index": n, "question": quiz_questions row}   (문항마다)
+      event: done     / data: /from-url 과 같은 응답
+      event: error    / data: {"error": "...", "status": n}
+    """
+    mode = (data.get("mode") or "mixed").strip().lower()
+    user_id = data.get("user_id")
+    session_id = data.get("session_id")
+    run_id = data.get("run_id")
+    use_bank = data.get("use_bank", True)
+    # 런마다 한 번 생성 (프론트는 생성할 때마다 새 런을 만듦) → 같은 런으로 다시 들어온 스트림은
+    # 같은 문항 id 로 덮어써서 중복이 쌓이지 않게. run_id 가 없으면 고정할 키가 없어 그냥 insert
+    save_key = run_id or None
+
+    async def events():
+        rows = []
+        finished = False
+        # 생성과 저장이 문항 단위로 겹치므로 "generating" 에는 문항별 저장 시간도 포함
+        timer = metrics.StageTimer("quiz.stream")
+        try:
+            timer.enter("loading")
+            yield sse.event({"stage": "loading"}, "stage")
+            docs, failed_files = await _load_docs(data.get("file_urls") or [])
+            timer.enter("bank")
+            fp, picked, available = await _take_from_bank(docs, mode, use_bank)
+
+            if picked is not None:
+                timer.enter("saving")
+                rows = await _insert_questions(picked, session_id, save_key)
+                answer_keys.remember(session_id, rows)
+                for i, row in enumerate(rows):
+                    yield sse.event({"index": i, "question": row}, "question")
+                _bank_after_generate(fp, docs, mode, [], available, use_bank)
+            else:
+                timer.enter("condensing")
+                yield sse.event({"stage": "condensing"}, "stage")
+                all_text = await condense.condense(docs)
+                timer.enter("generating")
+                yield sse.event({"stage": "generating"}, "stage")
+
+                generated = []
+                stream = _stream_questions(all_text, mode)
+                try:
+                    async for q in stream:
+                        # 나머지 문항을 기다리지 않고 한 문항씩 바로 저장 → 전송
+                        inserted = await _insert_questions([q], session_id, save_key, start=len(rows))
+                        answer_keys.remember(session_id, inserted)
+                        generated.append(q)
+                        rows.extend(inserted)
+                        for row in inserted:
+                            yield sse.event({"index": len(rows) - 1, "question": row}, "question")
+                        # 클라이언트가 떠났으면 남은 생성은 중단 (이미 저장한 문항은 유지)
+                        if await req.is_disconnected():
+                            break
+                finally:
+                    await stream.aclose()
+
+                if not rows:
+                    raise JobError(500, {"error": "OpenAI 처리 실패: 생성된 문항이 없습니다."})
+                _bank_after_generate(fp, docs, mode, generated, available, use_bank)
+
+            timer.enter("saving")
+            await _finish_quiz(rows, session_id, run_id, user_id, idempotent=save_key is not None)
+            finished = True
+            timer.close()
+            yield sse.event({
+                "message": "퀴즈 생성 완료",
                 "session_id": session_id,
-                "question": q.get("question", "").strip(),
-                "choices": cleaned,
-                "answer": answer,
-                "explanation": explanation,
-            })
+                "run_id": run_id,
+                "quiz_count": len(rows),
+                "quiz": rows,
+                "failed_files": failed_files,
+            }, "done")
+        except JobError as e:
+            yield sse.event(dict(e.content, status=e.status), "error")
+        except Exception as e:
+            yield sse.event({"error": str(e) or e.__class__.__name__, "status": 500}, "error")
+        finally:
+            timer.close()
+            if rows and not finished:
+                # 도중에 실패·끊김 → 이미 저장한 문항으로 세션/런을 마무리 (고아 문항이 남지 않게).
+                # 응답 태스크가 취소된 상태일 수 있으므로 별도 작업으로
+                background.spawn(
+                    background.retry(lambda: _finish_quiz(rows, session_id, run_id, user_id, idempotent=True)),
+                    name="quiz.stream.finish",
+                )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        inserted = supabase.table("quiz_questions").insert(questions).execute()
+@router.post("/from-url")
+async def generate_quiz_from_url(req: Request):
+    data = await req.json()
+    if not (data.get("file_urls") or []):
+        return JSONResponse(status_code=400, content={"error": "file_urls가 없습니다."})
 
-        # 세션/런 quiz_count 업데이트
-        supabase.table("quiz_runs").update({"quiz_count": len(inserted.data)}).eq("id", run_id).execute()
-        supabase.table("quiz_sessions").update({"quiz_count": len(inserted.data)}).eq("id", session_id).execute()
+    # Accept: text/event-stream 이면 문항이 완성되는 대로 스트리밍
+    if "text/event-stream" in req.headers.get("accept", ""):
+        return _stream_quiz(req, data)
 
-        # 첫 문제 메시지 저장 (전체 퀴즈 목록 payload로)
-        supabase.table("quiz_messages").insert({
-            "session_id": session_id,
-            "run_id": run_id,
-            "user_id": user_id,
-            "role": "ai",
-            "kind": "quiz",
-            "payload": json.dumps({"quiz": inserted.data}),
-        }).execute()
+    # 작업 모드: 큐에 넣고 바로 job id 반환 → /jobs/{job_id} 폴링 또는 /jobs/{job_id}/events 구독
+    if data.get("job"):
+        job_id = await job_queue.enqueue("quiz.from_url", data)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
 
-        return JSONResponse({
-            "message": "퀴즈 생성 완료",
-            "session_id": session_id,
-            "run_id": run_id,
-            "quiz_count": len(inserted.data),
-            "quiz": inserted.data
-        })
+    try:
+        return JSONResponse(await _quiz_from_url(data))
+    except JobError as e:
+        return JSONResponse(status_code=e.status, content=e.content)
 
-    except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+@router.post("/from-url/stream")
+async def generate_quiz_from_url_stream(req: Request):
+    """/from-url 의 스트리밍 전용 버전 (Accept 헤더를 못 바꾸는 클라이언트용)"""
+    data = await req.json()
+    if not (data.get("file_urls") or []):
+        return JSONResponse(status_code=400, content={"error": "file_urls가 없습니다."})
+    return _stream_quiz(req, data)
+
+# ---------------- 퀴즈 생성 작업 조회 ----------------
+@router.get("/jobs/{job_id}")
+async def get_quiz_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "작업 없음"})
+    return JSONResponse(job)
+
+@router.get("/jobs/{job_id}/events")
+async def quiz_job_events(job_id: str, req: Request):
+    """작업 상태를 SSE 로 전달 (단계가 바뀔 때마다 event: stage, 끝나면 event: done / failed)"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "작업 없음"})
+
+    async def _events():
+        q = job_queue.subscribe(job_id)
+        try:
+            # 구독 직전에 끝났을 수도 있으니 구독 후 상태를 다시 읽어 시작
+            current = await job_queue.get(job_id)
+            last = None
+            while True:
+                status = current["status"]
+                if status in ("done", "failed"):
+                    yield sse.event(current, status)
+                    return
+                if current.get("stage") != last:
+                    last = current.get("stage")
+                    yield sse.event({"status": status, "stage": last}, "stage")
+                try:
+                    current = await asyncio.wait_for(q.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await req.is_disconnected():
+                        return
+                    # 알림을 놓쳤을 경우 대비해 DB 상태로 다시 맞춤
+                    current = await job_queue.get(job_id)
+        finally:
+            job_queue.unsubscribe(job_id, q)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ---------------- 정답 채점 ----------------
+async def _persist_attempt(user_id, session_id, question_id, user_answer: str, is_correct: bool) -> None:
+    """답안 + 오답 노트 저장 (응답을 보낸 뒤 백그라운드에서, 실패 시 재시도)"""
+    now = datetime.now(KST).isoformat()
+    # 행을 재시도 밖에서 만들어 두어야 다시 보내도 같은 id (insert_once)
+    answer = {
+        "user_id": user_id,
+        "question_id": question_id,
+        "user_answer": user_answer,
+        "is_correct": is_correct,
+        "session_id": session_id,
+        "answered_at": now
+    }
+    writes = [background.retry(lambda: db.insert_once("quiz_answers", answer).execute())]
+    if not is_correct:
+        note = {
+            "user_id": user_id,
+            "question_id": question_id,
+            "reviewed": False,
+            "created_at": now
+        }
+        writes.append(background.retry(lambda: db.insert_once("quiz_incorrect_notes", note).execute()))
+    try:
+        await asyncio.gather(*writes)
+    finally:
+        report_cache.bump(user_id)
+
 @router.post("/attempt")
 async def attempt(req: Request):
+    """
+    정답표는 퀴즈 생성 때 채워 둔 세션 캐시에서 읽어 바로 채점한다.
+    - 답안/오답 노트 저장은 응답 후 백그라운드에서 동시에 (재시도 포함, 종료 시 drain)
+    - 피드백 메시지만 기다림: 프론트가 곧이어 다음 문제 메시지를 저장하므로 대화 순서 유지
+    캐시가 따뜻하면 Supabase 왕복은 피드백 메시지 저장 1회
+    """
     payload = await req.json()
     session_id = payload.get("session_id")
     run_id = payload.get("run_id")
@@ -339,58 +611,39 @@ async def attempt(req: Request):
     user_answer = (payload.get("user_answer") or "").strip()
 
     try:
-        # 유저 찾기
-        user_res = supabase.table("profiles").select("id").eq("email", user_email).limit(1).execute()
-        if not user_res.data:
-            return JSONResponse(status_code=404, content={"error": "유저 없음"})
-        user_id = user_res.data[0]["id"]
-
-        # 정답 + 해설 로드
-        q_res = (
-            supabase.table("quiz_questions")
-            .select("answer, explanation")
-            .eq("id", question_id)
-            .limit(1)
-            .execute()
+        # 유저 찾기 / 정답 + 해설 로드 (둘 다 캐시 우선, 미스면 동시에 조회)
+        user_id, key = await asyncio.gather(
+            identity.user_id_for_email(user_email),
+            answer_keys.lookup(session_id, question_id),
         )
-        if not q_res.data:
+        if user_id is None:
+            return JSONResponse(status_code=404, content={"error": "유저 없음"})
+        if key is None:
             return JSONResponse(status_code=404, content={"error": "문항 없음"})
 
-        correct_answer = (q_res.data[0]["answer"] or "").strip()
-        explanation = (q_res.data[0].get("explanation") or "").strip()
+        correct_answer = (key["answer"] or "").strip()
+        explanation = (key.get("explanation") or "").strip()
 
         # 채점
         is_correct = user_answer.lower() == correct_answer.lower()
 
-        # 답안 저장
-        supabase.table("quiz_answers").insert({
-            "user_id": user_id,
-            "question_id": question_id,
-            "user_answer": user_answer,
-            "is_correct": is_correct,
-            "session_id": session_id,
-            "answered_at": datetime.now(KST).isoformat()
-        }).execute()
-
-        # 오답 노트 저장
-        if not is_correct:
-            supabase.table("quiz_incorrect_notes").insert({
-                "user_id": user_id,
-                "question_id": question_id,
-                "reviewed": False,
-                "created_at": datetime.now(KST).isoformat()
-            }).execute()
+        # 답안 + 오답 노트 저장은 응답을 기다리게 하지 않음
+        background.spawn(
+            _persist_attempt(user_id, session_id, question_id, user_answer, is_correct),
+            name="quiz.persist_attempt",
+        )
 
         # 피드백 메시지 저장 (여기서는 텍스트만, 해설은 응답 JSON으로 넘김)
         feedback = "✅ 정답입니다!" if is_correct else f"❌ 오답입니다. 정답은 {correct_answer}"
-        supabase.table("quiz_messages").insert({
+        message = {
             "session_id": session_id,
             "run_id": run_id,
             "user_id": user_id,
             "role": "ai",
             "kind": "text",
             "payload": json.dumps({"text": feedback}),
-        }).execute()
+        }
+        await background.retry(lambda: db.insert_once("quiz_messages", message).execute(), attempts=2)
 
         return JSONResponse({
             "is_correct": is_correct,
@@ -400,3 +653,120 @@ async def attempt(req: Request):
 
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
+
+# ---------------- 한 런의 답안 일괄 채점 ----------------
+MAX_BATCH_ANSWERS = 100
+
+def _feedback_text(is_correct: bool, correct_answer: str) -> str:
+    return "✅ 정답입니다!" if is_correct else f"❌ 오답입니다. 정답은 {correct_answer}"
+
+@router.post("/attempt/batch")
+async def attempt_batch(req: Request):
+    """
+    한 런의 답안을 한 번에 채점
+      body: {session_id, run_id, user_email, answers: [{question_id, user_answer}, ...]}
+    정답표는 세션 캐시(미스면 세션 문항 1회 조회)에서 읽어 메모리에서 채점하고,
+    quiz_answers / quiz_incorrect_notes / quiz_messages 를 테이블별 multi-row insert 로 동시에 저장한다.
+    → 답안 수와 관계없이 DB 호출 수가 일정
+    """
+    payload = await req.json()
+    session_id = payload.get("session_id")
+    run_id = payload.get("run_id")
+    user_email = payload.get("user_email")
+    answers = payload.get("answers") or []
+
+    if not isinstance(answers, list) or not answers:
+        return JSONResponse(status_code=400, content={"error": "answers가 없습니다."})
+    if len(answers) > MAX_BATCH_ANSWERS:
+        return JSONResponse(status_code=400, content={"error": f"answers는 최대 {MAX_BATCH_ANSWERS}개까지 가능합니다."})
+    # 정답표 캐시를 조회하기 전에 형식부터 확인 ("None" 같은 문항 ID 로 캐시/DB 를 찌르지 않도록)
+    for i, a in enumerate(answers):
+        if not isinstance(a, dict):
+            return JSONResponse(status_code=400, content={"error": f"answers[{i}]는 객체여야 합니다."})
+        question_id = a.get("question_id")
+        if not isinstance(question_id, (str, int)) or isinstance(question_id, bool) or not str(question_id).strip():
+            return JSONResponse(status_code=400, content={"error": f"answers[{i}].question_id가 없습니다."})
+        if not isinstance(a.get("user_answer") or "", str):
+            return JSONResponse(status_code=400, content={"error": f"answers[{i}].user_answer는 문자열이어야 합니다."})
+
+    try:
+        question_ids = [str(a["question_id"]).strip() for a in answers]
+        user_id, keys = await asyncio.gather(
+            identity.user_id_for_email(user_email),
+            answer_keys.lookup_many(session_id, question_ids),
+        )
+        if user_id is None:
+            return JSONResponse(status_code=404, content={"error": "유저 없음"})
+
+        now = datetime.now(KST).isoformat()
+        results, answer_rows, note_rows, message_rows = [], [], [], []
+        for a, question_id in zip(answers, question_ids):
+            key = keys.get(question_id)
+            if key is None:
+                results.append({"question_id": question_id, "error": "문항 없음"})
+                continue
+
+            user_answer = (a.get("user_answer") or "").strip()
+            correct_answer = (key.get("answer") or "").strip()
+            is_correct = user_answer.lower() == correct_answer.lower()
+            results.append({
+                "question_id": question_id,
+                "is_correct": is_correct,
+                "correct_answer": correct_answer,
+                "explanation": (key.get("explanation") or "").strip(),
+            })
+
+            answer_rows.append({
+                "user_id": user_id,
+                "question_id": question_id,
+                "user_answer": user_answer,
+                "is_correct": is_correct,
+                "session_id": session_id,
+                "answered_at": now,
+            })
+            if not is_correct:
+                note_rows.append({
+                    "user_id": user_id,
+                    "question_id": question_id,
+                    "reviewed": False,
+                    "created_at": now,
+                })
+            # 대화 기록: 내 답 → 피드백 순서 (행 순서대로 seq 가 매겨짐)
+            for role, text in (("user", user_answer), ("ai", _feedback_text(is_correct, correct_answer))):
+                message_rows.append({
+                    "session_id": session_id,
+                    "run_id": run_id,
+                    "user_id": user_id,
+                    "role": role,
+                    "kind": "text",
+                    "payload": json.dumps({"text": text}),
+                })
+
+        # 행마다 id 를 정해 두고 보내므로 타임아웃 뒤 재시도해도 묶음 전체가 중복되지 않음
+        writes = [
+            background.retry(lambda table=table, rows=rows: db.insert_once(table, rows).execute())
+            for table, rows in (
+                ("quiz_answers", answer_rows),
+                ("quiz_incorrect_notes", note_rows),
+                ("quiz_messages", message_rows),
+            )
+            if rows
+        ]
+        await asyncio.gather(*writes)
+        if answer_rows:
+            report_cache.bump(user_id)
+
+        graded = [r for r in results if "error" not in r]
+        correct = sum(1 for r in graded if r["is_correct"])
+        return JSONResponse({
+            "session_id": session_id,
+            "run_id": run_id,
+            "results": results,
+            "total": len(graded),
+            "correct": correct,
+            "incorrect": len(graded) - correct,
+            "score": round(correct / len(graded) * 100, 2) if graded else 0,
+        })
+
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
@@ -1,16 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
 from datetime import date, datetime, timedelta
-from typing import Dict, Any, List
-from openai import OpenAI
-
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import json
 import os
+import re
 
-from config import supabase
+from services import db, identity, kst, llm, profiling
+from services.cache import TTLCache
+from services.attendance_rollup import attendance_rollups
+from services.report_cache import etag_matches, report_cache
+from services.singleflight import SingleFlight
 
 router = APIRouter()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 # ------------------------------------------------------------------
 # 공통 유틸
@@ -30,57 +35,39 @@ def parse_ts(v):
 
 
 # ------------------------------------------------------------------
-# 1. email → uuid 변환
+# 1. email → uuid 변환 / 2. 사용자 프로필
+#    → services.identity (양방향 TTL 캐시, 없는 email 도 잠깐 캐시)
 # ------------------------------------------------------------------
-def resolve_user_id(user_id: str) -> str:
-    import re
-
-    uuid_regex = re.compile(
-        r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
-        r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
-    )
-
-    if uuid_regex.match(user_id):
-        return user_id
-
-    resp = supabase.table("profiles").select("id").eq("email", user_id).execute()
-    if len(resp.data) == 0:
+async def resolve_user_id(user_id: str) -> str:
+    user_uuid = await identity.resolve_user_id(user_id)
+    if user_uuid is None:
         raise HTTPException(status_code=404, detail="해당 email을 가진 사용자가 없습니다.")
-    return resp.data[0]["id"]
+    return user_uuid
 
 
 # ------------------------------------------------------------------
-# 2. 사용자 프로필
+# 3. 출석 요약
 # ------------------------------------------------------------------
-def get_user_profile(user_uuid: str) -> Dict[str, Any]:
-    resp = (
-        supabase.table("profiles")
-        .select("full_name, email")
-        .eq("id", user_uuid)
-        .execute()
-    )
-
-    if not resp.data:
-        return {"id": user_uuid, "name": None, "email": None}
-
-    row = resp.data[0]
-    return {
-        "id": user_uuid,
-        "name": row.get("full_name"),
-        "email": row.get("email"),
-    }
+# 잔디(heatmap)에 보여 주는 기간. 원본 행은 이 기간만 읽고 전체 누적값은 롤업에서
+DAILY_DAYS = int(os.getenv("REPORT_DAILY_DAYS", "140"))  # 20주
 
 
-# ------------------------------------------------------------------
-# 3. 출석 요약
-# ------------------------------------------------------------------
-def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
-    res = (
-        supabase.table("attendance_logs")
+async def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
+    # 전체 누적(총 시간/세션/출석일/연속 출석)은 롤업 한 행으로,
+    # 원본은 최근 DAILY_DAYS 일만 (trend 14일, 이번 주, 오늘, 잔디용) → 둘을 동시에 조회
+    # 출석 기록·롤업·ETag 와 같은 KST 날짜 기준 (UTC 서버에서 00~09시 KST 에 하루 밀리지 않게)
+    today = kst.today()
+    monday = today - timedelta(days=today.weekday())
+    since = min(today - timedelta(days=max(DAILY_DAYS, 14) - 1), monday)
+    rollup, res = await asyncio.gather(
+        attendance_rollups.get(user_uuid),
+        db.attendance_logs()
         .select("date, seconds, session_count")
         .eq("user_id", user_uuid)
+        .gte("date", since.isoformat())
+        .lte("date", today.isoformat())
         .order("date", desc=False)
-        .execute()
+        .execute(),
     )
 
     rows = res.data or []
@@ -88,7 +75,6 @@ def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
     # =========================
     # ⭐ trend 계산: 최근 14일간 접속시간(분)
     # =========================
-    today = date.today()
     last_14 = [today - timedelta(days=i) for i in range(13, -1, -1)]  # 오래된 → 최근
 
     # 로그 dict: {"2025-11-21": seconds, ...}
@@ -105,10 +91,10 @@ def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
         trend.append(round(sec / 60))  # 분 단위
 
     # =========================
-    # 기존 출석 통계 계산 (네 코드 유지)
+    # 기존 출석 통계 계산 (누적값은 롤업에서)
     # =========================
 
-    if not rows:
+    if not rollup.get("days"):
         return {
             "days": 0,
             "total_seconds": 0,
@@ -121,66 +107,32 @@ def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
             "trend": trend,     # ⭐ 추가됨
         }
 
-    total_seconds = 0
-    total_sessions = 0
-    dates = set()
-
-    monday = today - timedelta(days=today.weekday())
+    daily_since = today - timedelta(days=DAILY_DAYS - 1)
     daily = []
     this_week_seconds = 0
 
-    for r in rows:
-        d = r.get("date")
-        if isinstance(d, str):
-            d = date.fromisoformat(d)
-
-        seconds = r.get("seconds", 0)
-        session_count = r.get("session_count", 0)
-
-        total_seconds += seconds
-        total_sessions += session_count
-        dates.add(d)
-
+    for d, seconds in log_map.items():
         if d >= monday:
             this_week_seconds += seconds
+        if d >= daily_since:
+            daily.append({
+                "date": d.isoformat(),
+                "seconds": seconds
+            })
 
-        daily.append({
-            "date": d.isoformat(),
-            "seconds": seconds
-        })
+    today_seconds = log_map.get(today, 0)
 
-    today_seconds = next(
-        (r.get("seconds", 0) for r in rows if str(r.get("date")) == today.isoformat()),
-        0
-    )
-
-    # streak 계산
-    sorted_dates = sorted(dates)
-    best_streak = 0
-    current = 0
-    prev = None
-
-    for d in sorted_dates:
-        if prev is None or (d - prev).days == 1:
-            current += 1
-        else:
-            current = 1
-        best_streak = max(best_streak, current)
-        prev = d
-
-    current_streak = 0
-    cursor = today
-    while cursor in dates:
-        current_streak += 1
-        cursor -= timedelta(days=1)
+    # 롤업의 현재 연속 출석은 마지막 출석일 기준 → 오늘 출석했을 때만 유효 (기존 계산과 동일)
+    last_date = rollup.get("last_date")
+    current_streak = rollup.get("current_streak", 0) if str(last_date) == today.isoformat() else 0
 
     return {
-        "days": len(dates),
-        "total_seconds": total_seconds,
+        "days": rollup["days"],
+        "total_seconds": rollup.get("total_seconds") or 0,
         "today_seconds": today_seconds,
-        "sessions": total_sessions,
+        "sessions": rollup.get("total_sessions") or 0,
         "current_streak": current_streak,
-        "best_streak": best_streak,
+        "best_streak": rollup.get("best_streak") or 0,
         "this_week_seconds": this_week_seconds,
         "daily": daily,
         "trend": trend,     # ⭐ 여기!
@@ -191,34 +143,73 @@ def get_attendance_summary(user_uuid: str) -> Dict[str, Any]:
 # ------------------------------------------------------------------
 # 4. 퀴즈 요약
 # ------------------------------------------------------------------
-def calculate_run_stats(session_id: str) -> Dict[str, Any]:
-    answers = (
-        supabase.table("quiz_answers")
-        .select("is_correct")
-        .eq("session_id", session_id)
-        .execute()
-    )
+# quiz_answers 를 session_id IN (...) 으로 한 번에 읽을 때 한 요청에 넣는 세션 수 (URL 길이 제한)
+SESSION_IN_CHUNK = 200
+# PostgREST 기본 max-rows(1000) 를 넘지 않도록 페이지 단위로 읽음
+ANSWER_PAGE_SIZE = 1000
 
-    rows = answers.data or []
-    if not rows:
-        return {"total": 0, "correct": 0, "incorrect": 0, "score": 0}
-
-    total = len(rows)
-    correct = sum(1 for r in rows if r.get("is_correct") is True)
-    incorrect = total - correct
-    score = (correct / total) * 100
 
+def _stats(total: int, correct: int) -> Dict[str, Any]:
+    if not total:
+        return {"total": 0, "correct": 0, "incorrect": 0, "score": 0}
     return {
         "total": total,
         "correct": correct,
-        "incorrect": incorrect,
-        "score": score,
+        "incorrect": total - correct,
+        "score": (correct / total) * 100,
     }
 
 
-def get_quiz_summary(user_uuid: str) -> Dict[str, Any]:
-    runs_res = (
-        supabase.table("quiz_runs")
+async def calculate_run_stats(session_id: str) -> Dict[str, Any]:
+    return (await calculate_session_stats([session_id]))[session_id]
+
+
+async def calculate_session_stats(session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    여러 세션의 채점 통계를 한 번에 계산 (세션마다 쿼리하지 않음)
+
+    quiz_answers 를 session_id IN (...) 으로 묶어 읽고(세션 200개·1000행 단위로 나눠서)
+    session_id 별 (전체, 정답) 개수를 한 번 순회로 집계한다. 세션 묶음끼리는 동시에 조회
+    """
+    unique_ids = list(dict.fromkeys(sid for sid in session_ids if sid))
+    totals: Dict[str, int] = {sid: 0 for sid in unique_ids}
+    corrects: Dict[str, int] = {sid: 0 for sid in unique_ids}
+
+    async def read_chunk(chunk: List[str]) -> None:
+        offset = 0
+        while True:
+            res = await (
+                db.quiz_answers()
+                .select("session_id, is_correct")
+                .in_("session_id", chunk)
+                .order("id", desc=False)
+                .range(offset, offset + ANSWER_PAGE_SIZE - 1)
+                .execute()
+            )
+            rows = res.data or []
+            for r in rows:
+                sid = r.get("session_id")
+                if sid in totals:
+                    totals[sid] += 1
+                    if r.get("is_correct") is True:
+                        corrects[sid] += 1
+            if len(rows) < ANSWER_PAGE_SIZE:
+                return
+            offset += ANSWER_PAGE_SIZE
+
+    await asyncio.gather(*(
+        read_chunk(unique_ids[i:i + SESSION_IN_CHUNK])
+        for i in range(0, len(unique_ids), SESSION_IN_CHUNK)
+    ))
+    out = {sid: _stats(totals[sid], corrects[sid]) for sid in unique_ids}
+    for sid in session_ids:
+        out.setdefault(sid, _stats(0, 0))
+    return out
+
+
+async def get_quiz_summary(user_uuid: str) -> Dict[str, Any]:
+    runs_res = await (
+        db.quiz_runs()
         .select("id, session_id, started_at")
         .eq("user_id", user_uuid)
         .order("started_at", desc=False)
@@ -243,8 +234,11 @@ def get_quiz_summary(user_uuid: str) -> Dict[str, Any]:
     total_correct = 0
     total_incorrect = 0
 
+    # 런마다 quiz_answers 를 조회하던 N+1 대신 세션 전체를 한 번에 집계
+    session_stats = await calculate_session_stats([run["session_id"] for run in runs])
+
     for run in runs:
-        stats = calculate_run_stats(run["session_id"])
+        stats = session_stats[run["session_id"]]
         total_questions += stats["total"]
         total_correct += stats["correct"]
         total_incorrect += stats["incorrect"]
@@ -271,13 +265,13 @@ def get_quiz_summary(user_uuid: str) -> Dict[str, Any]:
 # ------------------------------------------------------------------
 # 5. 최종 리포트 API
 # ------------------------------------------------------------------
-@router.get("/summary")
-def get_summary(user_id: str = Query(...)):
-    user_uuid = resolve_user_id(user_id)
-
-    profile = get_user_profile(user_uuid)
-    attendance = get_attendance_summary(user_uuid)
-    quiz = get_quiz_summary(user_uuid)
+async def build_summary(user_uuid: str) -> Dict[str, Any]:
+    # 프로필(캐시) / 출석 / 퀴즈는 서로 독립 → 동시에 (프로파일링 중이면 각각 span 으로)
+    profile, attendance, quiz = await asyncio.gather(
+        profiling.traced("report.profile", identity.get_profile(user_uuid)),
+        profiling.traced("report.attendance", get_attendance_summary(user_uuid)),
+        profiling.traced("report.quiz", get_quiz_summary(user_uuid)),
+    )
 
     attendance_rate = min(attendance["days"] * 10, 100)
 
@@ -297,14 +291,46 @@ def get_summary(user_id: str = Query(...)):
         "quiz_summary": quiz_summary_legacy,
     }
 
-@router.post("/ai-summary")
-def ai_summary(payload: dict):
-    try:
-        user_data = payload.get("summary")
-        if not user_data:
-            raise HTTPException(status_code=400, detail="summary 데이터가 필요합니다.")
 
-        prompt = f"""
+@router.get("/summary")
+async def get_summary(
+    user_id: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    리포트 요약. 사용자별로 캐시하고 ETag 를 붙인다.
+    출석/퀴즈 쓰기가 없었고 캐시가 살아 있으면 If-None-Match 에 304 (Supabase 조회 없음)
+    """
+    user_uuid = await resolve_user_id(user_id)
+
+    # 계산 전에 ETag 를 잡아 둠 → 계산 도중 쓰기가 생기면 다음 요청에서 새 ETag 로 다시 계산
+    etag = report_cache.etag(user_uuid)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    cached = report_cache.get(user_uuid)
+    if cached is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(cached[1], headers=headers)
+
+    body = await build_summary(user_uuid)
+    report_cache.set(user_uuid, etag, body)
+    return JSONResponse(body, headers=headers)
+
+# ------------------------------------------------------------------
+# 6. AI 리포트 (입력 요약이 같으면 캐시된 결과 재사용)
+# ------------------------------------------------------------------
+AI_SUMMARY_MODEL = "gpt-4o"
+# 프롬프트를 고치면 올려서 이전 결과를 무효화
+AI_SUMMARY_PROMPT_VERSION = "1"
+_ai_cache = TTLCache(
+    maxsize=int(os.getenv("AI_SUMMARY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AI_SUMMARY_CACHE_TTL", str(24 * 3600))),
+)
+_ai_inflight = SingleFlight()
+
+
+def _ai_summary_prompt(user_data) -> str:
+    return f"""
         다음은 학습자의 학습 리포트 데이터입니다:
 
         {user_data}
@@ -329,42 +355,67 @@ def ai_summary(payload: dict):
         - 설명, 주석, 백틱 등 금지
         """
 
-        # 🔥 GPT 호출
-        res = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "너는 JSON만 출력하는 AI 리포트 분석기다."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.2,
-        )
-
-        # 🔥 응답 전체를 터미널에 그대로 출력
-        print("\n================ GPT RAW RESPONSE ================")
-        print(res)
-        print("==================================================\n")
-
-        # 🔥 본문 추출
-        raw = res.choices[0].message.content
-
-        print("=== RAW CONTENT ===")
-        print(raw)
-        print("===================\n")
-
-        if not raw or raw.strip() == "":
-            print("🔥 GPT content is EMPTY")
-            raise ValueError("GPT 응답이 비어 있음")
-
-        import re, json
-        json_match = re.search(r"\{[\s\S]*\}", raw)
-        if not json_match:
-            print("🔥 JSON 매칭 실패! GPT RAW TEXT ↓↓↓")
-            print(raw)
-            raise ValueError("JSON 블록을 찾지 못함")
-
-        json_str = json_match.group(0)
-        result = json.loads(json_str)
 
+def _ai_summary_key(user_data) -> str:
+    # 키 순서·공백과 무관한 정규화 JSON + 프롬프트/모델 버전
+    canonical = json.dumps(user_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(
+        f"{AI_SUMMARY_PROMPT_VERSION}|{AI_SUMMARY_MODEL}|{canonical}".encode()
+    ).hexdigest()
+
+
+async def _generate_ai_summary(user_data) -> Dict[str, Any]:
+    res = await llm.chat_completion(
+        AI_SUMMARY_MODEL,
+        [
+            {"role": "system", "content": "너는 JSON만 출력하는 AI 리포트 분석기다."},
+            {"role": "user", "content": _ai_summary_prompt(user_data)},
+        ],
+        temperature=0.2,
+        timeout=60,
+    )
+
+    # 🔥 본문 추출
+    raw = res.choices[0].message.content
+
+    if not raw or raw.strip() == "":
+        print("🔥 GPT content is EMPTY")
+        raise ValueError("GPT 응답이 비어 있음")
+
+    json_match = re.search(r"\{[\s\S]*\}", raw)
+    if not json_match:
+        print(f"🔥 JSON 매칭 실패! GPT RAW TEXT (앞 500자): {raw[:500]}")
+        raise ValueError("JSON 블록을 찾지 못함")
+
+    return json.loads(json_match.group(0))
+
+
+async def _cached_ai_summary(user_data) -> Dict[str, Any]:
+    key = _ai_summary_key(user_data)
+    cached = _ai_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # 같은 입력으로 동시에 들어온 요청은 upstream 호출 하나를 같이 기다림
+    # (먼저 온 요청이 끊겨도 생성은 계속되고, 기다리던 요청은 결과나 일반 예외를 받음)
+    return await _ai_inflight.do(key, lambda: _generate_and_cache(key, user_data))
+
+
+async def _generate_and_cache(key: str, user_data) -> Dict[str, Any]:
+    result = await _generate_ai_summary(user_data)
+    # 실패는 캐시하지 않음
+    _ai_cache.set(key, result)
+    return result
+
+
+@router.post("/ai-summary")
+async def ai_summary(payload: dict):
+    user_data = payload.get("summary")
+    if not user_data:
+        raise HTTPException(status_code=400, detail="summary 데이터가 필요합니다.")
+
+    try:
+        result = await _cached_ai_summary(user_data)
         return {"ai_report": result}
 
     except Exception as e:
@@ -0,0 +1,86 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from services import db
+from services.cache import TTLCache
+
+# 퀴즈 세션 하나를 푸는 데 충분한 시간(초). 지나면 채점 시 DB 에서 다시 읽음
+TTL = float(os.getenv("ANSWER_KEY_TTL", str(6 * 3600)))
+MAXSIZE = int(os.getenv("ANSWER_KEY_SESSIONS", "4096"))
+
+# session_id → {question_id: {"answer", "explanation"}}
+_keys = TTLCache(maxsize=MAXSIZE, ttl=TTL)
+
+
+def remember(session_id: str, rows: List[Dict[str, Any]]) -> None:
+    """퀴즈 생성 직후 저장된 quiz_questions 행으로 세션의 정답표를 채운다"""
+    if not session_id:
+        return
+    table = _keys.get(session_id) or {}
+    for row in rows:
+        if row.get("id") is not None:
+            table[str(row["id"])] = {
+                "answer": row.get("answer"),
+                "explanation": row.get("explanation"),
+            }
+    _keys.set(session_id, table)
+
+
+async def lookup(session_id: Optional[str], question_id: str) -> Optional[Dict[str, Any]]:
+    """
+    채점용 정답/해설. 캐시에 있으면 DB 조회 없이,
+    없으면 세션 문항 전체를 한 번에 읽어 채운 뒤 반환 (다음 문항부터는 캐시 적중)
+    """
+    question_id = str(question_id)
+    if session_id:
+        hit = (_keys.get(session_id) or {}).get(question_id)
+        if hit is not None:
+            return hit
+        res = await (
+            db.quiz_questions()
+            .select("id, answer, explanation")
+            .eq("session_id", session_id)
+            .execute()
+        )
+        remember(session_id, res.data or [])
+        hit = (_keys.get(session_id) or {}).get(question_id)
+        if hit is not None:
+            return hit
+
+    # 세션 정보가 없거나 다른 세션 문항인 경우 → 문항 하나만 조회
+    res = await (
+        db.quiz_questions()
+        .select("answer, explanation")
+        .eq("id", question_id)
+        .limit(1)
+        .execute()
+    )
+    return res.data[0] if res.data else None
+
+
+async def lookup_many(session_id: Optional[str], question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """여러 문항의 정답/해설을 한 번에 (캐시 → 세션 전체 1회 → 나머지 id IN 1회). 없는 문항은 빠짐"""
+    wanted = [str(q) for q in question_ids]
+    table = (_keys.get(session_id) or {}) if session_id else {}
+    if session_id and any(q not in table for q in wanted):
+        res = await (
+            db.quiz_questions()
+            .select("id, answer, explanation")
+            .eq("session_id", session_id)
+            .execute()
+        )
+        remember(session_id, res.data or [])
+        table = _keys.get(session_id) or {}
+
+    out = {q: table[q] for q in wanted if q in table}
+    missing = [q for q in dict.fromkeys(wanted) if q not in out]
+    if missing:
+        res = await (
+            db.quiz_questions()
+            .select("id, answer, explanation")
+            .in_("id", missing)
+            .execute()
+        )
+        for row in res.data or []:
+            out[str(row["id"])] = row
+    return out
@@ -0,0 +1,320 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services import db, kst
+from services.attendance_rollup import attendance_rollups
+from services.kst import KST
+from services.report_cache import report_cache
+from services.singleflight import SingleFlight
+
+# ---------------- 설정 ----------------
+# 몇 초마다 모아둔 출석 시간을 DB에 반영할지
+FLUSH_INTERVAL = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", "5"))
+# 반영 대기 중인 (user_id, date) 키가 이 개수를 넘으면 주기를 기다리지 않고 바로 flush
+FLUSH_MAX_KEYS = int(os.getenv("ATTENDANCE_FLUSH_MAX_KEYS", "500"))
+# 이 시간(초) 동안 갱신이 없던 키는 flush 후 메모리에서 제거
+IDLE_EVICT_SECONDS = float(os.getenv("ATTENDANCE_IDLE_EVICT_SECONDS", "600"))
+# 버퍼를 가진 프로세스가 호스트에 하나뿐인지 확인하는 잠금 파일 / 재시작 때 이전 프로세스가 놓기를 기다리는 시간(초)
+LOCK_PATH = os.getenv("ATTENDANCE_LOCK_PATH", os.path.join(tempfile.gettempdir(), "sturoom-attendance.lock"))
+LOCK_WAIT = float(os.getenv("ATTENDANCE_LOCK_WAIT", "15"))
+
+Key = Tuple[str, str]  # (user_id, "YYYY-MM-DD")
+
+
+def split_by_kst_day(start: datetime, end: datetime) -> Dict[str, int]:
+    """[start, end) 구간을 KST 자정 기준으로 잘라 날짜별 초로 변환"""
+    out: Dict[str, int] = {}
+    cursor = start.astimezone(KST)
+    end = end.astimezone(KST)
+    while cursor < end:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time(), tzinfo=KST)
+        chunk_end = min(end, next_midnight)
+        day = cursor.date().isoformat()
+        out[day] = out.get(day, 0) + int((chunk_end - cursor).total_seconds())
+        cursor = chunk_end
+    return out
+
+
+class AttendanceBuffer:
+    """
+    /attendance/log 하트비트를 (user_id, date) 단위로 메모리에서 합산하고,
+    일정 주기 또는 대기 키 개수 기준으로 attendance_logs 에 일괄 upsert 한다.
+
+    - 키를 처음 볼 때만 DB 에서 기존 값을 한 번 읽고, 이후 틱은 메모리에서만 누적
+    - 같은 프로세스 안에서는 누적이 직렬화되므로 동시 틱의 증가분이 유실되지 않음
+    - 누적값(절대값)을 upsert 하므로 같은 사용자가 여러 워커로 나뉘어 들어오면
+      마지막 flush 값이 우선한다 → 워커 1개 전제. start() 에서 잠금 파일로 강제하고,
+      같은 호스트에 버퍼를 가진 프로세스가 이미 있으면 시작하지 않는다
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_keys: int = FLUSH_MAX_KEYS,
+        lock_path: str = LOCK_PATH,
+    ):
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.lock_path = lock_path
+        self._lock_fd: Optional[int] = None
+
+        self._totals: Dict[Key, Dict[str, int]] = {}
+        # 마지막으로 DB 에 반영된 값 (행이 없으면 None) → flush 때 롤업에 더할 증가분 계산용
+        self._persisted: Dict[Key, Optional[Dict[str, int]]] = {}
+        self._touched: Dict[Key, float] = {}
+        self._dirty: Set[Key] = set()
+        self._loading = SingleFlight()
+
+        self._lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------- 기존 값 로드 ----------------
+    async def _ensure_loaded(self, key: Key) -> None:
+        if key in self._totals:
+            return
+
+        # 같은 키를 동시에 여러 번 조회하지 않도록 진행 중인 로드를 공유
+        await self._loading.do(key, lambda: self._load(key))
+
+    async def _load(self, key: Key) -> None:
+        user_id, day = key
+        res = await (
+            db.attendance_logs()
+            .select("seconds, session_count")
+            .eq("user_id", user_id)
+            .eq("date", day)
+            .execute()
+        )
+        rows = res.data or []
+        async with self._lock:
+            if key not in self._totals:
+                self._load_row(key, rows[0] if rows else None)
+            self._touched[key] = time.monotonic()
+
+    async def _ensure_loaded_many(self, keys: List[Key]) -> None:
+        """여러 키의 기존 값을 한 번의 SELECT 로 읽어 둔다 (배치 수집용)"""
+        missing = [k for k in set(keys) if k not in self._totals and k not in self._loading]
+        if missing:
+            user_ids = sorted({k[0] for k in missing})
+            days = sorted({k[1] for k in missing})
+            res = await (
+                db.attendance_logs()
+                .select("user_id, date, seconds, session_count")
+                .in_("user_id", user_ids)
+                .in_("date", days)
+                .execute()
+            )
+            found = {(r["user_id"], str(r["date"])): r for r in (res.data or [])}
+            async with self._lock:
+                now = time.monotonic()
+                for key in missing:
+                    if key not in self._totals:
+                        self._load_row(key, found.get(key))
+                    self._touched[key] = now
+
+        # 다른 요청이 로드 중이던 키는 그 결과를 기다림
+        for key in set(keys):
+            await self._ensure_loaded(key)
+
+    def _load_row(self, key: Key, row: Optional[dict]) -> None:
+        # self._lock 을 잡은 상태에서 호출
+        totals = {
+            "seconds": (row or {}).get("seconds") or 0,
+            "session_count": (row or {}).get("session_count") or 0,
+        }
+        self._totals[key] = totals
+        self._persisted[key] = dict(totals) if row is not None else None
+
+    # ---------------- 누적 ----------------
+    def _apply(self, key: Key, seconds: int, sessions: Optional[int] = None) -> Dict[str, int]:
+        # self._lock 을 잡은 상태에서 호출
+        totals = self._totals[key]
+        if sessions is not None:
+            # 접속/종료 경계를 아는 호출자(presence)가 세션 수를 직접 넘긴 경우
+            totals["session_count"] += sessions
+        elif totals["seconds"] == 0 and seconds > 0:
+            totals["session_count"] += 1
+        totals["seconds"] += seconds
+
+        self._touched[key] = time.monotonic()
+        self._dirty.add(key)
+        if len(self._dirty) >= self.max_keys:
+            self._wakeup.set()
+        return dict(totals)
+
+    async def add(
+        self, user_id: str, day: str, seconds: int, sessions: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        (user_id, day) 에 seconds 를 더하고, 버퍼 기준 누적값을 바로 돌려준다.
+        세션 카운트: sessions 를 넘기면 그만큼 더하고,
+        없으면 그날 첫 기록일 때 +1 (기존 /log 동작과 동일)
+        """
+        key = (user_id, day)
+        while True:
+            await self._ensure_loaded(key)
+
+            async with self._lock:
+                if key not in self._totals:
+                    # 로드 직후 flush 가 유휴 키로 정리해 버린 경우 → 다시 로드
+                    continue
+                return self._apply(key, seconds, sessions)
+
+    async def add_many(
+        self, deltas: Dict[Key, int], explicit_sessions: bool = False
+    ) -> Dict[Key, Dict[str, int]]:
+        """
+        여러 (user_id, date) 증가분을 한 번에 누적한다.
+        기존 값 조회는 한 번의 SELECT 로 끝내고, 키별 누적값을 돌려준다.
+        explicit_sessions=True 이면 세션 카운트는 건드리지 않는다 (presence 가 따로 집계)
+        """
+        result: Dict[Key, Dict[str, int]] = {}
+        sessions = 0 if explicit_sessions else None
+        pending = {k: v for k, v in deltas.items() if v > 0}
+        while pending:
+            await self._ensure_loaded_many(list(pending))
+
+            async with self._lock:
+                for key in list(pending):
+                    if key in self._totals:
+                        result[key] = self._apply(key, pending.pop(key), sessions)
+        return result
+
+    # ---------------- flush ----------------
+    async def flush(self, only: Optional[Iterable[Key]] = None) -> int:
+        """
+        대기 중인 키를 한 번의 multi-row upsert 로 반영. 반영한 행 수를 반환
+        같이 attendance_rollups 에 (지난 flush 이후) 증가분만 더한다.
+        only 를 넘기면 그 키들만 반영 (요청 하나가 다른 사용자 몫까지 쓰지 않도록)
+        """
+        async with self._flush_lock:
+            async with self._lock:
+                keys = list(self._dirty if only is None else self._dirty.intersection(only))
+                self._dirty.difference_update(keys)
+                snapshot = {key: dict(self._totals[key]) for key in keys}
+                changes = {}
+                for key, cur in snapshot.items():
+                    prev = self._persisted.get(key)
+                    changes[key] = {
+                        "seconds": cur["seconds"] - (prev or {}).get("seconds", 0),
+                        "sessions": cur["session_count"] - (prev or {}).get("session_count", 0),
+                        "new_day": prev is None,
+                    }
+                rows = [
+                    {
+                        "user_id": user_id,
+                        "date": day,
+                        "seconds": snapshot[(user_id, day)]["seconds"],
+                        "session_count": snapshot[(user_id, day)]["session_count"],
+                    }
+                    for user_id, day in keys
+                ]
+
+            if rows:
+                try:
+                    await attendance_rollups.commit(
+                        lambda: db.attendance_logs().upsert(rows, on_conflict="user_id, date").execute(),
+                        changes,
+                    )
+                except Exception:
+                    # 실패한 키는 다음 flush 에서 다시 시도 (누적값이라 그대로 재전송하면 됨)
+                    async with self._lock:
+                        self._dirty.update(keys)
+                    raise
+
+                async with self._lock:
+                    self._persisted.update(snapshot)
+                # 반영된 사용자의 리포트 캐시 무효화
+                report_cache.bump_many(user_id for user_id, _ in keys)
+
+            if only is None:
+                self._evict_idle()
+            return len(rows)
+
+    def _evict_idle(self) -> None:
+        today = kst.today().isoformat()
+        now = time.monotonic()
+        for key in list(self._totals):
+            if key in self._dirty:
+                continue
+            idle = now - self._touched.get(key, 0) > IDLE_EVICT_SECONDS
+            if key[1] != today or idle:
+                self._totals.pop(key, None)
+                self._touched.pop(key, None)
+                self._persisted.pop(key, None)
+
+    # ---------------- 백그라운드 루프 ----------------
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠ 출석 flush 실패: {e}")
+
+    # ---------------- 단일 워커 확인 ----------------
+    async def _acquire_writer_lock(self) -> None:
+        workers = int(os.getenv("WEB_CONCURRENCY", "1") or "1")
+        if workers > 1:
+            raise RuntimeError(
+                f"출석 버퍼는 워커 1개 전제입니다 (WEB_CONCURRENCY={workers}). 누적값 upsert 라 워커가 여럿이면 증가분이 유실됩니다"
+            )
+        try:
+            import fcntl
+        except ImportError:
+            # flock 이 없는 환경(Windows 개발 PC)에서는 확인 생략
+            return
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + LOCK_WAIT
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise RuntimeError(
+                        f"다른 프로세스가 출석 버퍼를 쓰고 있습니다 ({self.lock_path}). 워커 1개로 실행하세요 (uvicorn --workers 1)"
+                    )
+                # 재시작 중이면 이전 프로세스가 마지막 flush 후 잠금을 놓을 때까지 대기
+                await asyncio.sleep(0.5)
+        self._lock_fd = fd
+
+    def _release_writer_lock(self) -> None:
+        if self._lock_fd is not None:
+            # 닫으면 flock 도 풀림
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self._acquire_writer_lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """종료 시 루프를 멈추고 남은 값을 마지막으로 flush"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        finally:
+            self._release_writer_lock()
+
+
+attendance_buffer = AttendanceBuffer()
@@ -0,0 +1,252 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services import db
+
+# 원본 행을 처음부터 다시 읽을 때 한 번에 가져오는 행 수 (PostgREST max-rows)
+PAGE_SIZE = 1000
+
+ROLLUP_COLUMNS = (
+    "days", "total_seconds", "total_sessions",
+    "first_date", "last_date", "current_streak", "best_streak",
+)
+
+Key = Tuple[str, str]  # (user_id, "YYYY-MM-DD")
+
+
+def _as_date(v) -> Optional[date]:
+    if v is None or isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v)[:10])
+
+
+def _empty(user_id: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "days": 0,
+        "total_seconds": 0,
+        "total_sessions": 0,
+        "first_date": None,
+        "last_date": None,
+        "current_streak": 0,
+        "best_streak": 0,
+    }
+
+
+def build_rollup(user_id: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """attendance_logs 원본 행 전체 → 롤업 (처음 만들 때 / 순서가 뒤섞인 날짜가 들어왔을 때)"""
+    rollup = _empty(user_id)
+    days = set()
+    for r in rows:
+        rollup["total_seconds"] += r.get("seconds") or 0
+        rollup["total_sessions"] += r.get("session_count") or 0
+        days.add(_as_date(r.get("date")))
+
+    run = 0
+    prev = None
+    for d in sorted(days):
+        run = run + 1 if prev is not None and (d - prev).days == 1 else 1
+        rollup["best_streak"] = max(rollup["best_streak"], run)
+        prev = d
+
+    if days:
+        rollup["days"] = len(days)
+        rollup["first_date"] = min(days)
+        rollup["last_date"] = prev
+        rollup["current_streak"] = run
+    return rollup
+
+
+def _advance(rollup: Dict[str, Any], day: date) -> bool:
+    """새 날짜 하나를 롤업에 반영. 마지막 날짜보다 이전 날짜면 증분 계산이 불가능 → False"""
+    last = rollup["last_date"]
+    if last is not None and day <= last:
+        return False
+    run = rollup["current_streak"] + 1 if last is not None and (day - last).days == 1 else 1
+    rollup["current_streak"] = run
+    rollup["best_streak"] = max(rollup["best_streak"], run)
+    rollup["last_date"] = day
+    rollup["first_date"] = rollup["first_date"] or day
+    rollup["days"] += 1
+    return True
+
+
+class AttendanceRollups:
+    """
+    사용자별 출석 누적값(attendance_rollups) 관리
+
+    - 총 시간/세션/출석일, 첫·마지막 출석일, 현재/최고 연속 출석일을 한 행에 보관
+    - 출석 버퍼가 attendance_logs 를 flush 할 때 그 증가분만 더해 갱신 (원본 재집계 없음)
+    - 롤업이 없는 사용자는 처음 필요할 때 원본 전체를 한 번 읽어 만든다 (lazy backfill)
+    - 마지막 출석일보다 이전 날짜가 새로 생기면(배치 업로드 등) 그 사용자만 원본에서 다시 계산
+
+    버퍼와 같이 단일 프로세스 전제. 같은 사용자의 증분 반영과 재계산이 겹치지 않도록 사용자별 락으로 직렬화한다.
+    평소 조회는 락 없이 읽고, 재계산이 필요할 때만 그 사용자의 락을 잡는다.
+    """
+
+    def __init__(self):
+        # user_id → [락, 사용 중인 수]. 아무도 안 쓰면 바로 제거해 사용자 수만큼 쌓이지 않게 함
+        self._locks: Dict[str, List[Any]] = {}
+        # 반영에 실패한 증가분 (다음 flush 때 함께 재시도)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    # ---------------- 사용자별 락 ----------------
+    @asynccontextmanager
+    async def _locked(self, user_ids: Iterable[str]) -> AsyncIterator[None]:
+        """여러 사용자의 락을 정렬된 순서로 잡음 (서로 다른 순서로 잡다가 교착되지 않도록)"""
+        waiting: List[str] = []
+        acquired: List[str] = []
+        try:
+            for user_id in sorted(set(user_ids)):
+                entry = self._locks.setdefault(user_id, [asyncio.Lock(), 0])
+                entry[1] += 1
+                waiting.append(user_id)
+                await entry[0].acquire()
+                acquired.append(user_id)
+            yield
+        finally:
+            for user_id in reversed(acquired):
+                self._locks[user_id][0].release()
+            for user_id in waiting:
+                entry = self._locks[user_id]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(user_id, None)
+
+    # ---------------- DB ----------------
+    async def _fetch(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        res = await (
+            db.attendance_rollups()
+            .select("user_id, " + ", ".join(ROLLUP_COLUMNS))
+            .in_("user_id", user_ids)
+            .execute()
+        )
+        out = {}
+        for r in res.data or []:
+            r["first_date"] = _as_date(r.get("first_date"))
+            r["last_date"] = _as_date(r.get("last_date"))
+            out[r["user_id"]] = r
+        return out
+
+    async def _raw_rows(self, user_id: str) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            res = await (
+                db.attendance_logs()
+                .select("date, seconds, session_count")
+                .eq("user_id", user_id)
+                .order("date", desc=False)
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+            )
+            page = res.data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    async def _save(self, rollups: List[Dict[str, Any]]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        payload = [
+            dict(
+                r,
+                first_date=r["first_date"].isoformat() if r["first_date"] else None,
+                last_date=r["last_date"].isoformat() if r["last_date"] else None,
+                updated_at=now,
+            )
+            for r in rollups
+        ]
+        await db.attendance_rollups().upsert(payload, on_conflict="user_id").execute()
+
+    # ---------------- 공개 API ----------------
+    async def rebuild(self, user_id: str) -> Dict[str, Any]:
+        """원본 전체에서 다시 계산해 저장 (락 안에서 호출)"""
+        rollup = build_rollup(user_id, await self._raw_rows(user_id))
+        await self._save([rollup])
+        return rollup
+
+    async def get(self, user_id: str) -> Dict[str, Any]:
+        """롤업 한 행 조회. 없으면 원본에서 한 번 만들어 저장"""
+        found = (await self._fetch([user_id])).get(user_id)
+        if found is not None and user_id not in self._pending:
+            return found
+
+        async with self._locked([user_id]):
+            # 락을 기다리는 동안 다른 요청이 이미 다시 만들었을 수 있음
+            if user_id not in self._pending:
+                found = (await self._fetch([user_id])).get(user_id)
+                if found is not None:
+                    return found
+            # 반영 못 한 증가분이 남아 있으면 원본 기준으로 다시 맞춤
+            rollup = await self.rebuild(user_id)
+            self._pending.pop(user_id, None)
+            return rollup
+
+    async def commit(self, write: Callable[[], Awaitable[Any]], changes: Dict[Key, Dict[str, Any]]) -> None:
+        """
+        await write() 로 attendance_logs 를 반영하고, 성공하면 같은 락 안에서 증가분을 롤업에 더한다.
+        락은 이번에 바뀌는 사용자(+ 재시도할 증가분이 남은 사용자) 것만 잡는다.
+            changes = {key: {"seconds": 증가분, "sessions": 증가분, "new_day": 이번에 처음 생긴 행인지}}
+
+        원본 쓰기와 롤업 갱신 사이에 재계산(get/rebuild)이 끼어들면 같은 증가분이 두 번 더해지므로
+        둘을 한 락 안에서 처리한다. write() 실패는 그대로 올리고(버퍼가 재시도),
+        롤업 갱신 실패는 증가분을 보관해 다음 commit 때 다시 시도한다.
+        """
+        user_ids = {user_id for user_id, _ in changes} | set(self._pending)
+        async with self._locked(user_ids):
+            await write()
+            try:
+                await self._apply(changes, user_ids)
+            except Exception as e:
+                print(f"⚠ 출석 롤업 갱신 실패(다음 flush 때 재시도): {e}")
+
+    async def _apply(self, changes: Dict[Key, Dict[str, Any]], user_ids: Iterable[str]) -> None:
+        # user_ids 의 락을 잡은 상태에서 호출. 락을 잡지 않은 사용자의 보류분은 건드리지 않음
+        by_user = {u: self._pending.pop(u) for u in user_ids if u in self._pending}
+        for (user_id, day), c in changes.items():
+            acc = by_user.setdefault(user_id, {"seconds": 0, "sessions": 0, "new_days": set()})
+            acc["seconds"] += c.get("seconds", 0)
+            acc["sessions"] += c.get("sessions", 0)
+            if c.get("new_day"):
+                acc["new_days"].add(_as_date(day))
+        if not by_user:
+            return
+
+        done = set()
+        try:
+            existing = await self._fetch(sorted(by_user))
+            updated = []
+            for user_id, acc in by_user.items():
+                rollup = existing.get(user_id)
+                if rollup is None:
+                    # 롤업이 아직 없으면 원본(방금 flush 한 값 포함)에서 처음 생성
+                    await self.rebuild(user_id)
+                    done.add(user_id)
+                    continue
+                rollup["total_seconds"] = (rollup.get("total_seconds") or 0) + acc["seconds"]
+                rollup["total_sessions"] = (rollup.get("total_sessions") or 0) + acc["sessions"]
+                if not all(_advance(rollup, d) for d in sorted(acc["new_days"])):
+                    # 이전 날짜가 끼어들면 연속 출석을 증분으로 고칠 수 없으므로 재계산
+                    await self.rebuild(user_id)
+                    done.add(user_id)
+                    continue
+                updated.append(rollup)
+            if updated:
+                await self._save(updated)
+                done.update(r["user_id"] for r in updated)
+        except Exception:
+            # 원본은 이미 반영됐으므로 증가분을 보관해 두었다가 다음 flush 때 다시 시도
+            for user_id, acc in by_user.items():
+                if user_id in done:
+                    continue
+                pending = self._pending.setdefault(user_id, {"seconds": 0, "sessions": 0, "new_days": set()})
+                pending["seconds"] += acc["seconds"]
+                pending["sessions"] += acc["sessions"]
+                pending["new_days"] |= acc["new_days"]
+            raise
+
+
+attendance_rollups = AttendanceRollups()
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import Header, HTTPException
+
+from config import SUPABASE_JWT_SECRET, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+from services import metrics
+from services.cache import TTLCache
+from services.http import get_http_client
+from services.singleflight import SingleFlight
+
+# ---------------- 설정 ----------------
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_URL = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+# JWKS 를 다시 받아오는 주기(초). 모르는 kid 가 오면 주기와 상관없이 한 번 갱신
+JWKS_TTL = float(os.getenv("SUPABASE_JWKS_TTL", "600"))
+# JWKS 조회 시도 사이 최소 간격(초). 위조 토큰(모르는 kid)이 몰려도 이 간격에 한 번만 조회
+JWKS_MIN_REFETCH = float(os.getenv("SUPABASE_JWKS_MIN_REFETCH", "30"))
+# 검증이 끝난 토큰을 다시 검증하지 않고 재사용하는 최대 시간(초). 토큰 만료 시각을 넘지는 않음
+TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+LEEWAY_SECONDS = 10
+
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+_jwks: Dict[str, Any] = {}
+_jwks_fetched_at = 0.0
+_jwks_attempted_at = float("-inf")
+# 진행 중인 JWKS 조회 (동시에 들어온 요청은 같은 조회를 기다림)
+_jwks_flight = SingleFlight()
+
+
+class _CannotVerifyLocally(Exception):
+    """로컬 검증 수단(secret / JWKS 키)이 없어서 원격 확인이 필요한 경우"""
+
+
+# ---------------- 로컬 검증 ----------------
+async def _fetch_jwks() -> None:
+    import jwt
+
+    global _jwks, _jwks_fetched_at
+    with metrics.upstream("auth", "jwks"):
+        r = await get_http_client().get(JWKS_URL, headers={"apikey": SUPABASE_SERVICE_ROLE_KEY}, timeout=5.0)
+        r.raise_for_status()
+    keys = {}
+    for jwk in r.json().get("keys", []):
+        if jwk.get("kid"):
+            keys[jwk["kid"]] = jwt.PyJWK(jwk).key
+    _jwks = keys
+    _jwks_fetched_at = time.monotonic()
+
+
+async def _refresh_jwks() -> None:
+    global _jwks_attempted_at
+    if "jwks" not in _jwks_flight:
+        _jwks_attempted_at = time.monotonic()
+    # 한 요청이 취소돼도 다른 요청이 기다리는 조회는 계속
+    await _jwks_flight.do("jwks", _fetch_jwks)
+
+
+async def _signing_key(kid: Optional[str]):
+    import jwt
+
+    now = time.monotonic()
+    stale = now - _jwks_fetched_at > JWKS_TTL
+    if (kid not in _jwks or stale) and now - _jwks_attempted_at >= JWKS_MIN_REFETCH:
+        try:
+            await _refresh_jwks()
+        except Exception as e:
+            # 이전 키가 있으면 그대로 쓰고, 한 번도 못 받았으면 원격 확인으로
+            print(f"⚠ JWKS 조회 실패: {e}")
+    key = _jwks.get(kid)
+    if key is None:
+        if not _jwks:
+            raise _CannotVerifyLocally("JWKS 없음")
+        # 최근에 받은 JWKS 에 없는 kid → 다시 조회하지 않고 거절 (원격 확인으로도 넘기지 않음)
+        raise jwt.InvalidTokenError(f"알 수 없는 kid: {kid}")
+    return key
+
+
+async def _decode_locally(token: str) -> Dict[str, Any]:
+    import jwt
+
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise _CannotVerifyLocally("SUPABASE_JWT_SECRET 미설정")
+        key = SUPABASE_JWT_SECRET
+    elif alg in ("RS256", "ES256"):
+        key = await _signing_key(header.get("kid"))
+    else:
+        raise jwt.InvalidAlgorithmError(f"지원하지 않는 alg: {alg}")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[alg],
+        audience=JWT_AUDIENCE,
+        leeway=LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"]},
+    )
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    # /auth/v1/user 응답과 같은 모양으로 맞춰 둔다 (호출부는 user["id"] 만 씀)
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+    }
+
+
+# ---------------- 원격 확인 (fallback) ----------------
+async def _fetch_user_remote(token: str) -> Dict[str, Any]:
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "apikey": SUPABASE_SERVICE_ROLE_KEY,  # Render에서도 동작하게
+    }
+    try:
+        # 401 은 토큰 문제이므로 정상 응답으로 집계 (연결 실패만 오류)
+        with metrics.upstream("auth", "user"):
+            res = await get_http_client().get(f"{SUPABASE_URL}/auth/v1/user", headers=headers, timeout=10.0)
+    except httpx.HTTPError as e:
+        print("🚨 Supabase API 연결 실패:", e)
+        raise HTTPException(status_code=500, detail="Supabase 연결 실패")
+
+    if res.status_code == 200:
+        return res.json()
+    print(f"❌ Supabase 인증 실패: {res.status_code} {res.text}")
+    raise HTTPException(status_code=401, detail="Supabase 인증 실패")
+
+
+# ---------------- 공개 API ----------------
+async def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Supabase access token 을 검증하고 사용자 정보를 돌려준다.
+
+    1) 이미 검증한 토큰이면 캐시에서 바로 반환
+    2) 서명/만료/audience 를 로컬에서 검증 (HS256 secret 또는 캐시된 JWKS)
+    3) 로컬 검증 수단이 없을 때만 /auth/v1/user 로 확인
+    """
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # PyJWT(+cryptography) 는 import 가 무거워 첫 검증 때 불러온다
+    import jwt
+
+    try:
+        claims = await _decode_locally(token)
+        user = _user_from_claims(claims)
+        ttl = min(TOKEN_CACHE_TTL, claims["exp"] - time.time())
+    except _CannotVerifyLocally:
+        user = await _fetch_user_remote(token)
+        ttl = TOKEN_CACHE_TTL
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+            if exp:
+                ttl = min(ttl, exp - time.time())
+        except jwt.PyJWTError:
+            pass
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="토큰이 만료되었습니다.")
+    except jwt.PyJWTError as e:
+        raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰: {e}")
+
+    _token_cache.set(cache_key, user, ttl=ttl)
+    return user
+
+
+async def get_current_user(authorization: str = Header(None)) -> Dict[str, Any]:
+    """
+    FastAPI 의존성: Authorization: Bearer <token> 을 검증해 사용자 정보를 주입
+
+        @router.post("/...")
+        async def handler(user: dict = Depends(get_current_user)):
+            user_id = user["id"]
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="인증 토큰이 없습니다.")
+    return await verify_token(authorization.split(" ", 1)[1])
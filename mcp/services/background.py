@@ -0,0 +1,63 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from services import db, profiling
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Awaitable, name: Optional[str] = None) -> asyncio.Task:
+    """
+    응답과 상관없이 끝까지 실행돼야 하는 작업을 띄운다.
+    참조를 잡아 두어 GC 로 사라지지 않게 하고, 예외는 로그로 남긴다.
+    """
+    task = asyncio.ensure_future(_detached(coro))
+    if name:
+        task.set_name(name)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def _detached(coro: Awaitable) -> Any:
+    # 응답 뒤에 도는 작업이 띄운 요청의 프로파일(span 트리)에 섞이지 않게
+    profiling.detach()
+    return await coro
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        print(f"⚠ 백그라운드 작업 실패({task.get_name()}): {exc!r}")
+
+
+async def drain(timeout: float = 30.0) -> None:
+    """종료 시 남은 작업이 끝날 때까지 기다린다 (timeout 이 지나면 취소)"""
+    if not _tasks:
+        return
+    pending = list(_tasks)
+    done, not_done = await asyncio.wait(pending, timeout=timeout)
+    for task in not_done:
+        task.cancel()
+
+
+async def retry(fn: Callable[[], Awaitable[Any]], attempts: int = 4, base_delay: float = 0.5) -> Any:
+    """
+    fn() 이 돌려주는 코루틴(Supabase 쓰기 등)을 실행하고 실패하면 지수 백오프(+지터)로 재시도.
+    시도마다 fn() 을 새로 호출하므로 lambda: db.insert_once(...).execute() 형태로 넘긴다.
+    응답을 보낸 뒤 반드시 남아야 하는 쓰기에 spawn 과 함께 사용한다.
+
+    - 커밋 후 응답만 유실돼도 다시 보내므로 fn 은 여러 번 실행돼도 결과가 같아야 함 (db.insert_once / upsert)
+    - 제약 위반 같은 4xx 오류는 다시 보내도 같은 결과라 바로 올림 (db.is_retryable)
+    """
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not db.is_retryable(e):
+                raise
+            await asyncio.sleep(random.uniform(0, base_delay * (2 ** attempt)))
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import os
+import re
+from typing import List, Optional, Tuple
+
+from services import llm
+from services.cache import TTLCache
+from services.singleflight import SingleFlight
+
+# ---------------- 설정 ----------------
+# 합친 자료가 이 토큰 수 이하면 요약 없이 원문 그대로 프롬프트에 사용
+DIRECT_TOKENS = int(os.getenv("CONDENSE_DIRECT_TOKENS", "9000"))
+# 요약 단계(map)에서 한 번에 넘기는 조각 크기(토큰)
+CHUNK_TOKENS = int(os.getenv("CONDENSE_CHUNK_TOKENS", "3000"))
+# 최종 프롬프트에 들어갈 요약본 전체 예산(토큰) → 조각별 요약 길이를 여기서 나눠 정함
+REDUCED_TOKENS = int(os.getenv("CONDENSE_REDUCED_TOKENS", "8000"))
+MIN_NOTE_TOKENS = 150
+# 요약 호출 동시 실행 수 (모델별 상한과 별개로 자료 한 묶음 안에서의 상한)
+CONCURRENCY = int(os.getenv("CONDENSE_CONCURRENCY", "8"))
+MODEL = os.getenv("CONDENSE_MODEL", "gpt-4o-mini")
+# 프롬프트를 바꾸면 올려서 이전 요약 캐시를 무효화
+PROMPT_VERSION = "1"
+
+_notes = TTLCache(maxsize=4096, ttl=float(os.getenv("CONDENSE_CACHE_TTL", str(24 * 3600))))
+_inflight = SingleFlight()
+
+_encoding = None
+_HANGUL = re.compile(r"[가-힣]")
+# 제목처럼 보이는 줄 (마크다운 헤더, "1.", "1-2", "Chapter", "제 3 장" 등) 앞에서 섹션을 나눔
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\d+(\.\d+)*[.)]?\s|[IVX]+\.\s|제\s*\d+\s*[장절]|chapter\b|section\b)", re.I)
+
+
+# ---------------- 토큰 수 ----------------
+def count_tokens(text: str) -> int:
+    """tiktoken 이 설치돼 있으면 정확히, 없으면 한글 1자≈1토큰 / 그 외 4자≈1토큰으로 추정"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    hangul = len(_HANGUL.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+# ---------------- 조각 나누기 ----------------
+def _sections(text: str) -> List[str]:
+    sections: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if _HEADING.match(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return [s for s in (s.strip() for s in sections) if s]
+
+
+def _split_long(section: str, limit: int) -> List[str]:
+    # 섹션 하나가 조각 크기를 넘으면 줄 단위로, 줄 하나가 넘으면 글자 단위로 자름
+    out: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in section.splitlines():
+        n = count_tokens(line)
+        if n > limit:
+            step = max(1, len(line) * limit // n)
+            pieces = [line[i:i + step] for i in range(0, len(line), step)]
+        else:
+            pieces = [line]
+        for piece in pieces:
+            n = count_tokens(piece)
+            if current and size + n > limit:
+                out.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += n
+    if current:
+        out.append("\n".join(current))
+    return out
+
+
+def chunk_document(fname: str, text: str, limit: int = CHUNK_TOKENS) -> List[str]:
+    """문서 하나를 섹션 경계 기준으로 limit 토큰 이하 조각으로 묶는다 (문서를 넘나들지 않음)"""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for section in _sections(text):
+        n = count_tokens(section)
+        parts = _split_long(section, limit) if n > limit else [section]
+        for part in parts:
+            n = count_tokens(part)
+            if current and size + n > limit:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(part)
+            size += n
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# ---------------- 요약 (map) ----------------
+def _note_prompt(fname: str, chunk: str, note_tokens: int) -> str:
+    return f"""
+다음은 강의 자료 "{fname}" 의 일부입니다.
+퀴즈 출제에 쓸 수 있도록 핵심 개념, 정의, 공식, 중요한 사실과 예시를 빠짐없이 정리해 주세요.
+
+요구사항:
+1) 한국어 불릿 목록으로, 약 {note_tokens} 토큰 이내
+2) 자료에 없는 내용은 추가하지 말 것
+3) 용어·숫자·고유명사는 원문 그대로 유지
+
+-----
+{chunk}
+-----
+"""
+
+
+async def _note(fname: str, chunk: str, note_tokens: int, sem: asyncio.Semaphore) -> str:
+    # 요약 분량보다 짧은 조각은 그대로 사용
+    if count_tokens(chunk) <= note_tokens:
+        return chunk
+
+    key = hashlib.sha256(f"{PROMPT_VERSION}|{MODEL}|{note_tokens}|{chunk}".encode()).hexdigest()
+    cached = _notes.get(key)
+    if cached is not None:
+        return cached
+
+    # 같은 조각을 동시에 요청하면 호출 하나를 공유
+    return await _inflight.do(key, lambda: _summarize(key, fname, chunk, note_tokens, sem))
+
+
+async def _summarize(key: str, fname: str, chunk: str, note_tokens: int, sem: asyncio.Semaphore) -> str:
+    async with sem:
+        resp = await llm.chat_completion(
+            MODEL,
+            [
+                {"role": "system", "content": "너는 강의 자료에서 시험에 나올 핵심만 정리하는 조교야."},
+                {"role": "user", "content": _note_prompt(fname, chunk, note_tokens)},
+            ],
+            temperature=0,
+            max_tokens=note_tokens * 2,
+            timeout=60,
+        )
+    note = (resp.choices[0].message.content or "").strip()
+    _notes.set(key, note)
+    return note
+
+
+# ---------------- 공개 API ----------------
+async def condense(docs: List[Tuple[str, str]], budget: int = DIRECT_TOKENS) -> str:
+    """
+    [(파일명, 추출 텍스트)] → 퀴즈 프롬프트에 넣을 자료 텍스트
+
+    합친 길이가 budget 토큰 이하면 원문을 그대로 쓰고,
+    넘으면 문서·섹션 단위로 조각내 병렬로 요약(map)한 뒤 문서 순서대로 이어 붙인다(reduce).
+    조각 요약은 내용 해시로 캐시하므로 같은 자료는 다시 요약하지 않는다.
+    요약에 실패한 조각은 원문 앞부분으로 대신한다.
+    """
+    full = "\n".join(f"\n### {fname}\n{text}" for fname, text in docs)
+    if count_tokens(full) <= budget:
+        return full
+
+    chunks: List[Tuple[str, str]] = [
+        (fname, chunk) for fname, text in docs for chunk in chunk_document(fname, text)
+    ]
+    note_tokens = max(MIN_NOTE_TOKENS, REDUCED_TOKENS // max(1, len(chunks)))
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    results = await asyncio.gather(
+        *[_note(fname, chunk, note_tokens, sem) for fname, chunk in chunks],
+        return_exceptions=True,
+    )
+
+    failed = sum(1 for r in results if isinstance(r, BaseException))
+    if failed:
+        print(f"⚠ 자료 요약 실패 {failed}/{len(chunks)}조각 → 원문 일부로 대체")
+
+    parts: List[str] = []
+    last: Optional[str] = None
+    fallback_chars = note_tokens * 2
+    for (fname, chunk), note in zip(chunks, results):
+        if fname != last:
+            parts.append(f"\n### {fname}")
+            last = fname
+        parts.append(chunk[:fallback_chars] if isinstance(note, BaseException) else note)
+
+    print(f"🧩 자료 요약: {len(docs)}개 문서 → {len(chunks)}조각 (조각당 ~{note_tokens}토큰)")
+    return "\n".join(parts)
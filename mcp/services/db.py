@@ -0,0 +1,203 @@
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Union
+
+import httpx
+
+from config import SUPABASE_SERVICE_ROLE_KEY, SUPABASE_URL
+from services import metrics
+
+if TYPE_CHECKING:
+    from postgrest import AsyncPostgrestClient, AsyncRequestBuilder
+
+# ---------------- 설정 ----------------
+# 한 워커가 동시에 띄울 수 있는 PostgREST 요청 수 (HTTP/2 면 적은 연결에 다중화)
+MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "50"))
+KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "60"))
+TIMEOUT = float(os.getenv("DB_TIMEOUT", "20"))
+
+TableName = Literal[
+    "attendance_logs",
+    "attendance_rollups",
+    "profiles",
+    "quiz_answers",
+    "quiz_bank",
+    "quiz_incorrect_notes",
+    "quiz_messages",
+    "quiz_questions",
+    "quiz_runs",
+    "quiz_sessions",
+]
+
+_client: Optional["AsyncPostgrestClient"] = None
+
+_METHOD_OPS = {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}
+
+
+def _operation(request: httpx.Request) -> str:
+    """/rest/v1/quiz_runs + POST(Prefer: resolution=merge-duplicates) → "quiz_runs.upsert" """
+    target = request.url.path.split("/rest/v1/", 1)[-1].strip("/") or "?"
+    if target.startswith("rpc/"):
+        return target.replace("/", ".")
+    if request.method == "POST":
+        op = "upsert" if "resolution=" in request.headers.get("prefer", "") else "insert"
+    else:
+        op = _METHOD_OPS.get(request.method, request.method.lower())
+    return f"{target}.{op}"
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """PostgREST 호출마다 테이블·동작별 지연시간 기록 (응답 헤더 수신까지 = DB 처리 완료 시점)"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        op = _operation(request)
+        t0 = time.perf_counter()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except Exception:
+            metrics.record_upstream("supabase", op, time.perf_counter() - t0, error=True)
+            raise
+        metrics.record_upstream("supabase", op, time.perf_counter() - t0, response.status_code >= 400)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def get_client() -> "AsyncPostgrestClient":
+    """
+    앱 전역 비동기 PostgREST 클라이언트 (service role).
+    supabase-py 와 같은 쿼리 체인을 쓰되 execute() 를 await 하므로 이벤트 루프를 막지 않고,
+    keep-alive 연결 풀을 공유해 한 워커에서 여러 DB 호출을 동시에 진행한다.
+
+        res = await db.table("quiz_runs").select("id").eq("user_id", uid).execute()
+    """
+    global _client
+    if _client is None:
+        # postgrest 는 첫 DB 호출 때 불러온다 (콜드 스타트 단축)
+        from postgrest import AsyncPostgrestClient
+
+        headers = {
+            "apikey": SUPABASE_SERVICE_ROLE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        base_url = f"{SUPABASE_URL.rstrip('/')}/rest/v1"
+        _client = AsyncPostgrestClient(
+            base_url,
+            headers=headers,
+            http_client=httpx.AsyncClient(
+                base_url=base_url,
+                headers=headers,
+                follow_redirects=True,
+                timeout=httpx.Timeout(TIMEOUT, connect=10.0),
+                # transport 를 직접 넘기면 연결 풀 설정도 transport 쪽에
+                transport=_TimedTransport(httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY,
+                    ),
+                )),
+            ),
+        )
+    return _client
+
+
+def table(name: TableName) -> "AsyncRequestBuilder":
+    return get_client().from_(name)
+
+
+# ---------------- 재시도 ----------------
+def insert_once(name: TableName, rows: Union[Dict[str, Any], List[Dict[str, Any]]]):
+    """
+    재시도해도 한 번만 들어가는 insert. 행마다 id(uuid)를 여기서 채워 두고 ON CONFLICT (id) DO NOTHING 으로 보내므로,
+    커밋은 됐는데 응답만 유실된(읽기 타임아웃) 요청을 같은 rows 로 다시 보내도 행이 중복되지 않는다.
+    id 가 uuid primary key 인 테이블에만 사용 (.sql.txt 참고)
+
+        rows = [...]
+        await background.retry(lambda: db.insert_once("quiz_answers", rows).execute())
+    """
+    for row in rows if isinstance(rows, list) else [rows]:
+        row.setdefault("id", str(uuid.uuid4()))
+    return table(name).upsert(rows, on_conflict="id", ignore_duplicates=True)
+
+
+# Postgres SQLSTATE 중 다시 보내면 성공할 수 있는 클래스 (연결, 직렬화 충돌/교착, 자원 부족, 관리자 개입·statement timeout, 시스템)
+_TRANSIENT_SQLSTATE = ("08", "40", "53", "57", "58")
+# PostgREST 자체 오류 중 DB 연결·풀 문제 (503/504)
+_TRANSIENT_PGRST = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    일시적인 실패(연결 끊김, 타임아웃, 5xx)만 True.
+    제약 위반·잘못된 값·없는 컬럼 같은 4xx 오류는 다시 보내도 같은 결과라 False
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    from postgrest.exceptions import APIError
+
+    if not isinstance(error, APIError):
+        return True
+    code = error.code
+    if isinstance(code, int):
+        # JSON 이 아닌 응답(게이트웨이 오류 등)은 HTTP 상태 코드가 들어옴
+        return code >= 500 or code == 429
+    code = str(code or "")
+    return code.startswith(_TRANSIENT_SQLSTATE) or code in _TRANSIENT_PGRST
+
+
+# ---------------- 테이블별 진입점 ----------------
+def attendance_logs() -> "AsyncRequestBuilder":
+    return table("attendance_logs")
+
+
+def attendance_rollups() -> "AsyncRequestBuilder":
+    return table("attendance_rollups")
+
+
+def profiles() -> "AsyncRequestBuilder":
+    return table("profiles")
+
+
+def quiz_sessions() -> "AsyncRequestBuilder":
+    return table("quiz_sessions")
+
+
+def quiz_runs() -> "AsyncRequestBuilder":
+    return table("quiz_runs")
+
+
+def quiz_questions() -> "AsyncRequestBuilder":
+    return table("quiz_questions")
+
+
+def quiz_answers() -> "AsyncRequestBuilder":
+    return table("quiz_answers")
+
+
+def quiz_messages() -> "AsyncRequestBuilder":
+    return table("quiz_messages")
+
+
+def quiz_incorrect_notes() -> "AsyncRequestBuilder":
+    return table("quiz_incorrect_notes")
+
+
+def quiz_bank() -> "AsyncRequestBuilder":
+    return table("quiz_bank")
+
+
+# ---------------- 수명 관리 ----------------
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,154 @@
+import asyncio
+import math
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from typing import List, Optional, Tuple, Union
+
+# 원본: 작은 파일은 bytes, 디스크로 내려간 큰 파일은 임시 파일 경로
+Source = Union[bytes, str]
+
+# ---------------- 설정 ----------------
+# 추출 전용 프로세스 수 (기본: CPU 수)
+WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+# 이 페이지 수보다 작은 PDF 는 나누지 않고 워커 하나에서 처리
+PARALLEL_MIN_PAGES = int(os.getenv("EXTRACT_PARALLEL_MIN_PAGES", "24"))
+# 워커 하나가 맡는 최소 페이지 수
+MIN_PAGES_PER_TASK = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 이벤트 루프/스레드가 떠 있는 프로세스를 fork 하지 않도록 spawn 사용
+        _pool = ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ---------------- 워커 프로세스에서 실행되는 함수 ----------------
+# (pickle 가능해야 하므로 모듈 최상위 함수, 무거운 import 는 함수 안에서)
+@contextmanager
+def _pdf_document(src: Source):
+    import pymupdf
+
+    if isinstance(src, bytes):
+        doc = pymupdf.open(stream=src, filetype="pdf")
+        try:
+            yield doc
+        finally:
+            doc.close()
+        return
+
+    # 파일 경로면 메모리 맵으로 열어 읽기 전용 페이지를 그대로 사용 (bytes 로 복사하지 않음)
+    # 같은 파일을 여러 워커가 페이지 구간별로 열어도 OS 페이지 캐시를 공유한다
+    with open(src, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            doc = pymupdf.open(stream=view, filetype="pdf")
+            try:
+                yield doc
+            finally:
+                doc.close()
+        finally:
+            view.release()
+
+
+def _pdf_page_count(src: Source) -> int:
+    with _pdf_document(src) as doc:
+        return doc.page_count
+
+
+def _pdf_pages(src: Source, start: int, end: int) -> str:
+    with _pdf_document(src) as doc:
+        return "\n".join(doc[i].get_text() for i in range(start, end))
+
+
+def _as_file(src: Source):
+    # python-pptx / python-docx 는 zip 멤버를 필요할 때 읽으므로 경로를 그대로 넘긴다
+    return BytesIO(src) if isinstance(src, bytes) else src
+
+
+def _pptx_text(src: Source) -> str:
+    from pptx import Presentation
+
+    prs = Presentation(_as_file(src))
+    slides = []
+    for slide in prs.slides:
+        texts = [s.text for s in slide.shapes if hasattr(s, "text") and s.text]
+        slides.append("\n".join(texts))
+    return "\n".join(slides)
+
+
+def _docx_text(src: Source) -> str:
+    from docx import Document
+
+    doc = Document(_as_file(src))
+    parts = [p.text for p in doc.paragraphs if p.text]
+    for table in doc.tables:
+        for row in table.rows:
+            cells = [c.text for c in row.cells if c.text]
+            if cells:
+                parts.append(" | ".join(cells))
+    return "\n".join(parts)
+
+
+# ---------------- 공개 API ----------------
+def _page_ranges(page_count: int) -> List[Tuple[int, int]]:
+    if page_count < PARALLEL_MIN_PAGES:
+        return [(0, page_count)]
+    per_task = max(MIN_PAGES_PER_TASK, math.ceil(page_count / WORKERS))
+    return [(s, min(s + per_task, page_count)) for s in range(0, page_count, per_task)]
+
+
+def _head(src: Source, n: int = 5) -> bytes:
+    if isinstance(src, bytes):
+        return src[:n]
+    with open(src, "rb") as f:
+        return f.read(n)
+
+
+def detect_kind(fname: str, src: Source) -> str:
+    if fname.endswith(".pdf") or _head(src) == b"%PDF-":
+        return "pdf"
+    if fname.endswith(".docx"):
+        return "docx"
+    # 기존 동작과 같이 나머지는 pptx 로 취급
+    return "pptx"
+
+
+async def extract_text(fname: str, content: Source) -> str:
+    """
+    PDF / PPTX / DOCX 텍스트 추출을 프로세스 풀에서 실행 (이벤트 루프를 막지 않음)
+    큰 PDF 는 페이지 구간으로 나눠 여러 워커가 동시에 처리한 뒤 순서대로 합친다.
+    content 가 파일 경로면 워커에는 경로만 넘기고 각 워커가 메모리 맵으로 읽는다.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    kind = detect_kind(fname, content)
+
+    if kind == "docx":
+        return await loop.run_in_executor(pool, _docx_text, content)
+    if kind == "pptx":
+        return await loop.run_in_executor(pool, _pptx_text, content)
+
+    page_count = await loop.run_in_executor(pool, _pdf_page_count, content)
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, _pdf_pages, content, start, end)
+        for start, end in _page_ranges(page_count)
+    ])
+    return "\n".join(parts)
@@ -0,0 +1,38 @@
+import os
+from typing import Optional
+
+import httpx
+
+# ---------------- 설정 ----------------
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    외부 파일 다운로드 등에 쓰는 앱 전역 httpx 클라이언트.
+    요청마다 새로 만들지 않으므로 같은 호스트(Supabase Storage 등)에 대해
+    TCP/TLS 연결을 재사용하고, HTTP/2 면 한 연결로 여러 요청을 동시에 보낸다.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
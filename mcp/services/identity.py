@@ -0,0 +1,90 @@
+import os
+import re
+from typing import Any, Dict, Optional
+
+from services import db
+from services.cache import TTLCache
+
+# ---------------- 설정 ----------------
+TTL = float(os.getenv("IDENTITY_CACHE_TTL", "600"))
+MAXSIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "8192"))
+# 없는 email 도 잠깐 기억해 같은 잘못된 요청이 매번 DB 로 가지 않게 (가입 직후 반영 지연의 상한)
+NEGATIVE_TTL = float(os.getenv("IDENTITY_NEGATIVE_TTL", "60"))
+
+UUID_RE = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+    r"[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)
+
+# 없는 사용자 표시 (None 은 캐시 미스와 구분이 안 되므로)
+_UNKNOWN = object()
+
+# email → profiles.id  /  profiles.id → {"id", "name", "email"}
+_ids = TTLCache(maxsize=MAXSIZE, ttl=TTL)
+_profiles = TTLCache(maxsize=MAXSIZE, ttl=TTL)
+
+
+def is_uuid(value: str) -> bool:
+    return bool(value) and UUID_RE.match(value) is not None
+
+
+def _normalize(email: str) -> str:
+    # profiles 조회가 대소문자를 구분하므로 키도 그대로 (앞뒤 공백만 제거)
+    return (email or "").strip()
+
+
+def _remember(row: Dict[str, Any]) -> Dict[str, Any]:
+    profile = {"id": row["id"], "name": row.get("full_name"), "email": row.get("email")}
+    _profiles.set(row["id"], profile)
+    if row.get("email"):
+        _ids.set(_normalize(row["email"]), row["id"])
+    return profile
+
+
+async def user_id_for_email(email: str) -> Optional[str]:
+    """email → 사용자 id (없으면 None). 조회한 프로필은 id → 프로필 방향 캐시도 같이 채움"""
+    key = _normalize(email)
+    if not key:
+        return None
+    cached = _ids.get(key)
+    if cached is _UNKNOWN:
+        return None
+    if cached is not None:
+        return cached
+
+    res = await db.profiles().select("id, full_name, email").eq("email", key).limit(1).execute()
+    if not res.data:
+        _ids.set(key, _UNKNOWN, ttl=NEGATIVE_TTL)
+        return None
+    return _remember(res.data[0])["id"]
+
+
+async def resolve_user_id(user_id_or_email: str) -> Optional[str]:
+    """UUID 면 그대로, 아니면 email 로 보고 조회"""
+    if is_uuid(user_id_or_email):
+        return user_id_or_email
+    return await user_id_for_email(user_id_or_email)
+
+
+async def get_profile(user_id: str) -> Dict[str, Any]:
+    """리포트용 프로필. 없으면 name/email 이 None 인 값 (기존 get_user_profile 과 동일)"""
+    cached = _profiles.get(user_id)
+    if cached is not None:
+        return cached
+
+    res = await db.profiles().select("id, full_name, email").eq("id", user_id).execute()
+    if not res.data:
+        missing = {"id": user_id, "name": None, "email": None}
+        _profiles.set(user_id, missing, ttl=NEGATIVE_TTL)
+        return missing
+    return _remember(res.data[0])
+
+
+def invalidate(user_id: Optional[str] = None, email: Optional[str] = None) -> None:
+    """프로필 변경/탈퇴 시 호출. id 만 넘겨도 캐시된 email 매핑까지 같이 지운다"""
+    if user_id is not None:
+        profile = _profiles.pop(user_id)
+        if profile and profile.get("email"):
+            _ids.pop(_normalize(profile["email"]))
+    if email is not None:
+        _ids.pop(_normalize(email))
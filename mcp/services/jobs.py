@@ -0,0 +1,314 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# ---------------- 설정 ----------------
+DB_PATH = Path(os.getenv("JOBS_DB_PATH", Path(tempfile.gettempdir()) / "sturoom-jobs.sqlite3"))
+# 동시에 실행하는 작업 수 (같은 DB 를 쓰는 모든 프로세스 합계 상한)
+WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# 실행 중인 작업의 소유권 유지 시간(초). 소유 프로세스가 LEASE_SECONDS/3 마다 연장하고,
+# 연장이 끊긴(프로세스가 죽은) 작업만 다른 워커가 다시 가져간다
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# 작업이 도중에 끊기면 다시 실행. 이 횟수를 넘으면 실패 처리
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# 끝난 작업 기록 보관 기간(초)
+RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+# 새 작업 알림을 놓쳐도 이 주기(초)마다 큐를 다시 확인
+POLL_INTERVAL = 5.0
+
+TERMINAL = ("done", "failed")
+
+# payload 에는 job_id 가 들어 있음 → 재실행돼도 같은 결과를 쓰도록 저장 키로 사용
+Handler = Callable[[Dict[str, Any], Callable[[str], Awaitable[None]]], Awaitable[Any]]
+
+# lease 가 끝난 running 작업 = 실행하던 프로세스가 죽었거나 멈춘 작업
+_EXPIRED = "status = 'running' AND COALESCE(lease_until, 0) < ?"
+
+
+class JobError(Exception):
+    """핸들러가 HTTP 응답과 같은 형태(status + content)로 실패를 알릴 때 사용"""
+
+    def __init__(self, status: int, content: Dict[str, Any]):
+        super().__init__(content.get("error") or str(content))
+        self.status = status
+        self.content = content
+
+
+class JobQueue:
+    """
+    SQLite 기반 로컬 작업 큐 (외부 서비스 없이 동작)
+
+    - enqueue 는 행 하나만 쓰고 바로 job id 를 돌려준다
+    - 워커는 조건부 UPDATE 한 번으로 작업을 가져간다 → 여러 프로세스(uvicorn 워커)가 같은 DB 를
+      써도 한 작업은 한 곳에서만 실행되고, running 작업 수는 합계 WORKERS 를 넘지 않음
+    - 실행 중인 작업은 owner + lease_until 로 소유권을 표시하고 heartbeat 로 연장
+    - 단계(stage)가 바뀔 때마다 DB 에 기록 → 폴링으로 조회, 구독자(SSE)에게는 바로 전달
+    - lease 가 끝난 작업만 다시 실행 (MAX_ATTEMPTS 까지). 살아 있는 다른 워커의 작업은 건드리지 않음
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Handler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        # 이 프로세스(큐 인스턴스) 식별자
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    # ---------------- SQLite ----------------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    lease_until REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            # 이전 버전에서 만든 DB 에는 소유권 컬럼이 없음
+            cols = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for col, typ in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if col not in cols:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {col} {typ}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _exec(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db().execute(sql, params).fetchall()
+
+    def _claim_sync(self) -> Optional[sqlite3.Row]:
+        """
+        가장 오래된 queued(또는 lease 가 끝난) 작업 하나를 running 으로 바꾸며 가져온다.
+        후보를 고른 뒤 "아직 가져갈 수 있는 상태이고 전체 running 수가 WORKERS 미만" 조건을 건
+        UPDATE 한 문장으로 차지하고 rowcount 로 확인 → 다른 프로세스와 동시에 골라도 한 곳만 성공
+        """
+        with self._lock:
+            db = self._db()
+            now = time.time()
+            self._fail_exhausted(db, now)
+            while True:
+                row = db.execute(
+                    f"SELECT id FROM jobs WHERE status = 'queued' OR ({_EXPIRED}) ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                cur = db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? "
+                    f"WHERE id = ? AND (status = 'queued' OR ({_EXPIRED})) "
+                    "AND (SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until >= ?) < ?",
+                    (self.owner, now + LEASE_SECONDS, now, row["id"], now, now, WORKERS),
+                )
+                if cur.rowcount == 1:
+                    return db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                # 다른 프로세스가 먼저 가져갔으면 다음 후보, 전체 상한에 걸렸으면 다음 기회에
+                if db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until >= ?", (now,)
+                ).fetchone()[0] >= WORKERS:
+                    return None
+
+    @staticmethod
+    def _fail_exhausted(db: sqlite3.Connection, now: float) -> None:
+        # 끊긴 작업 중 시도 횟수를 다 쓴 것은 다시 실행하지 않고 실패 처리
+        db.execute(
+            "UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, owner = NULL, updated_at = ? "
+            f"WHERE {_EXPIRED} AND attempts >= ?",
+            (json.dumps({"error": "재시도 횟수 초과", "status": 500}), now, now, MAX_ATTEMPTS),
+        )
+
+    def _recover_sync(self) -> int:
+        # lease 가 끝난 running 작업(죽은 프로세스의 작업) 수 → 워커가 다시 가져감. 오래된 기록 정리
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            self._fail_exhausted(db, now)
+            db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (now - RETENTION_SECONDS,),
+            )
+            return db.execute(f"SELECT COUNT(*) FROM jobs WHERE {_EXPIRED}", (now,)).fetchone()[0]
+
+    def _release_sync(self) -> None:
+        # 종료 때 취소한 작업은 lease 만료를 기다리지 않고 바로 다시 가져갈 수 있게 되돌림
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE owner = ? AND status = 'running'",
+                (time.time(), self.owner),
+            )
+
+    def _renew_sync(self) -> None:
+        with self._lock:
+            self._db().execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                (time.time() + LEASE_SECONDS, self.owner),
+            )
+
+    # ---------------- 조회 / 등록 ----------------
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": json.loads(row["error"]) if row["error"] else None,
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"등록되지 않은 작업 종류: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        await asyncio.to_thread(
+            self._exec,
+            "INSERT INTO jobs (id, kind, payload, status, stage, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(self._exec, "SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_dict(rows[0]) if rows else None
+
+    # ---------------- 구독 (SSE) ----------------
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, job_id: str, q: asyncio.Queue) -> None:
+        listeners = self._listeners.get(job_id)
+        if listeners is not None:
+            listeners.discard(q)
+            if not listeners:
+                self._listeners.pop(job_id, None)
+
+    def _publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        for q in self._listeners.get(job_id, ()):
+            q.put_nowait(event)
+
+    async def _update(self, job_id: str, **fields: Any) -> None:
+        # 소유권을 잃은(lease 만료 후 다른 워커가 가져간) 작업의 기록은 덮어쓰지 않음
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        await asyncio.to_thread(
+            self._exec, f"UPDATE jobs SET {cols} WHERE id = ? AND owner = ?", (*fields.values(), job_id, self.owner)
+        )
+
+    # ---------------- 워커 ----------------
+    async def _run(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        handler = self._handlers.get(row["kind"])
+
+        async def report(stage: str) -> None:
+            await self._update(job_id, stage=stage)
+            self._publish(job_id, {"status": "running", "stage": stage})
+
+        try:
+            if handler is None:
+                raise JobError(500, {"error": f"등록되지 않은 작업 종류: {row['kind']}"})
+            self._publish(job_id, {"status": "running", "stage": row["stage"]})
+            payload = json.loads(row["payload"])
+            payload["job_id"] = job_id
+            result = await handler(payload, report)
+        except asyncio.CancelledError:
+            # 종료 중 취소 → stop() 이 queued 로 되돌려 다음 시작 때(또는 다른 프로세스가) 다시 실행
+            raise
+        except JobError as e:
+            error = dict(e.content, status=e.status)
+            await self._update(job_id, status="failed", stage="failed", error=json.dumps(error, ensure_ascii=False))
+            self._publish(job_id, {"status": "failed", "stage": "failed", "error": error})
+        except Exception as e:
+            error = {"error": str(e) or e.__class__.__name__, "status": 500}
+            print(f"❌ 작업 실패({row['kind']}, {job_id}): {e!r}")
+            await self._update(job_id, status="failed", stage="failed", error=json.dumps(error, ensure_ascii=False))
+            self._publish(job_id, {"status": "failed", "stage": "failed", "error": error})
+        else:
+            await self._update(job_id, status="done", stage="done", result=json.dumps(result, ensure_ascii=False))
+            self._publish(job_id, {"status": "done", "stage": "done", "result": result})
+
+    async def _worker(self) -> None:
+        while True:
+            row = await asyncio.to_thread(self._claim_sync)
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # 다른 워커도 깨워서 남은 작업을 이어서 가져가게 함
+            self._wakeup.set()
+            await self._run(row)
+
+    async def _keep_leases(self) -> None:
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                await asyncio.to_thread(self._renew_sync)
+            except Exception as e:
+                print(f"⚠ 작업 lease 연장 실패: {e}")
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self._recover_sync)
+        if recovered:
+            print(f"🔁 중단됐던 작업 {recovered}건 다시 실행")
+        self._heartbeat = asyncio.create_task(self._keep_leases())
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(WORKERS)]
+
+    async def stop(self) -> None:
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+        await asyncio.to_thread(self._release_sync)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
+
+
+job_queue = JobQueue()
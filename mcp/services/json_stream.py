@@ -0,0 +1,69 @@
+import json
+from typing import Any, List
+
+
+class JsonArrayStream:
+    """
+    LLM 이 조각조각 내보내는 JSON 배열에서 완성된 원소(객체)만 바로바로 꺼내는 파서
+
+        parser = JsonArrayStream()
+        for delta in stream:
+            for item in parser.feed(delta):
+                ...
+
+    배열 앞뒤의 ```json 같은 군더더기는 무시하고, 최상위 배열의 객체 원소만 돌려준다.
+    문자열 안의 괄호·이스케이프는 건너뛰므로 원소 경계를 잘못 잡지 않는다.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, text: str) -> List[Any]:
+        items: List[Any] = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # 원소 사이 (쉼표/공백) 또는 배열 끝
+                if ch == "{":
+                    self._depth = 1
+                    self._item = [ch]
+                elif ch == "]":
+                    self._done = True
+                continue
+
+            self._item.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    raw = "".join(self._item)
+                    self._item = []
+                    items.append(json.loads(raw))
+        return items
@@ -0,0 +1,12 @@
+from datetime import date, datetime, timedelta, timezone
+
+# 출석·리포트의 "하루"는 서버 시간대와 상관없이 한국 시간 자정 기준
+KST = timezone(timedelta(hours=9))
+
+
+def now() -> datetime:
+    return datetime.now(KST)
+
+
+def today() -> date:
+    return now().date()
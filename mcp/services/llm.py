@@ -0,0 +1,245 @@
+import asyncio
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+
+from config import OPENAI_API_KEY
+from services import metrics
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# ---------------- 설정 ----------------
+# 호출 1회(재시도 포함)에 허용하는 기본 시간(초)
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+DEFAULT_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# 모델별 동시 호출 수 제한. 예) LLM_CONCURRENCY="gpt-4o-mini=16,gpt-4o=4"
+DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "8"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+_retryable: Optional[Tuple[type, ...]] = None
+
+
+def retryable_errors() -> Tuple[type, ...]:
+    """재시도할 openai 예외들. openai 패키지는 import 만 ~0.7s 라 처음 호출할 때 불러온다"""
+    global _retryable
+    if _retryable is None:
+        import openai
+
+        _retryable = (
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.RateLimitError,
+            openai.InternalServerError,
+        )
+    return _retryable
+
+
+def _parse_concurrency(raw: str) -> Dict[str, int]:
+    out = {}
+    for part in raw.split(","):
+        if "=" in part:
+            model, n = part.split("=", 1)
+            out[model.strip()] = int(n)
+    return out
+
+
+MODEL_CONCURRENCY = _parse_concurrency(os.getenv("LLM_CONCURRENCY", "gpt-4o-mini=16,gpt-4o=4"))
+
+_client: Optional["AsyncOpenAI"] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> "AsyncOpenAI":
+    """앱 전체가 공유하는 AsyncOpenAI 클라이언트 (keep-alive 커넥션 풀 재사용). 첫 호출 때 생성"""
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            # 재시도는 아래 chat_completion 에서 직접 (지터 + 전체 deadline 기준)
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=10.0),
+            ),
+        )
+    return _client
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    sem = _semaphores.get(model)
+    if sem is None:
+        sem = asyncio.Semaphore(MODEL_CONCURRENCY.get(model, DEFAULT_CONCURRENCY))
+        _semaphores[model] = sem
+    return sem
+
+
+def _backoff(attempt: int, error: Exception) -> float:
+    # 429 에 Retry-After 가 있으면 그 값을 우선
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    # full jitter: 0 ~ min(cap, base * 2^attempt)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+async def _call_with_retries(model: str, deadline: float, retries: int, call):
+    """call(remaining) 을 deadline 안에서 실행하고, 일시적 오류면 지터 백오프 후 재시도"""
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeoutError(f"LLM 응답 시간 초과 ({model})")
+        try:
+            return await asyncio.wait_for(call(remaining), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"LLM 응답 시간 초과 ({model})")
+        except Exception as e:
+            if not isinstance(e, retryable_errors()) or attempt >= retries:
+                raise
+            delay = _backoff(attempt, e)
+            if loop.time() + delay >= deadline:
+                raise
+            print(f"⚠ LLM 재시도 {attempt + 1}/{retries} ({model}): {e!r}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def chat_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    *,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    **kwargs: Any,
+):
+    """
+    chat.completions.create 공용 진입점.
+
+    - 모델별 세마포어로 동시 호출 수 제한 (대기 시간도 deadline 에 포함)
+    - timeout: 재시도까지 포함한 전체 제한 시간
+    - 일시적 오류(타임아웃/연결/429/5xx)는 지터 백오프로 재시도
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (DEFAULT_TIMEOUT if timeout is None else timeout)
+    client = get_client()
+
+    async def _attempt(remaining: float):
+        async with _semaphore(model):
+            # 세마포어 대기는 빼고 실제 호출(재시도는 시도마다)만 잰다
+            with metrics.upstream("openai", f"chat:{model}"):
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    timeout=remaining,
+                    **kwargs,
+                )
+        metrics.record_tokens(model, getattr(response, "usage", None))
+        return response
+
+    return await _call_with_retries(
+        model, deadline, DEFAULT_RETRIES if retries is None else retries, _attempt
+    )
+
+
+async def stream_chat_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    *,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """
+    stream=True 버전. 텍스트 조각(delta)을 도착하는 대로 yield 한다.
+
+    - 세마포어는 스트림이 끝날 때까지 잡고 있음
+    - 재시도는 첫 응답(스트림 연결) 전까지만
+    - 소비하는 쪽이 중간에 멈추면(aclose/취소) upstream 스트림도 닫아서 생성을 중단시킴
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (DEFAULT_TIMEOUT if timeout is None else timeout)
+    client = get_client()
+    sem = _semaphore(model)
+
+    try:
+        await asyncio.wait_for(sem.acquire(), timeout=max(0.0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"LLM 응답 시간 초과 ({model})")
+
+    # 마지막 청크에 usage 를 실어 보내도록 (토큰 집계용)
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    operation = f"chat.stream:{model}"
+    stream = None
+    t0 = time.perf_counter()
+    failed = False
+    try:
+        stream = await _call_with_retries(
+            model,
+            deadline,
+            DEFAULT_RETRIES if retries is None else retries,
+            lambda remaining: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                timeout=remaining,
+                **kwargs,
+            ),
+        )
+        chunks = stream.__aiter__()
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"LLM 응답 시간 초과 ({model})")
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"LLM 응답 시간 초과 ({model})")
+            if getattr(chunk, "usage", None) is not None:
+                metrics.record_tokens(model, chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except (GeneratorExit, asyncio.CancelledError):
+        # 소비하는 쪽이 먼저 닫거나 요청이 취소된 것 → upstream 실패는 아님
+        raise
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        # close() 가 취소/예외로 끝나도 permit 이 새지 않도록 먼저 반납
+        sem.release()
+        try:
+            if stream is not None:
+                # 클라이언트 연결이 끊겨 취소된 중이어도 upstream 스트림은 끝까지 닫음
+                with anyio.CancelScope(shield=True):
+                    await stream.close()
+        except Exception as e:
+            print(f"⚠ LLM 스트림 닫기 실패 ({model}): {e}")
+        finally:
+            # 연결 ~ 스트림 종료(또는 중단)까지
+            metrics.record_upstream("openai", operation, time.perf_counter() - t0, failed)
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# ---------------- 설정 ----------------
+CACHE_DIR = Path(os.getenv("MATERIAL_CACHE_DIR", Path(tempfile.gettempdir()) / "sturoom-materials"))
+# 메모리 계층에 보관할 추출 텍스트 총량(문자 수)
+MEMORY_MAX_CHARS = int(os.getenv("MATERIAL_CACHE_MEMORY_CHARS", str(20_000_000)))
+# 디스크 계층 최대 용량(바이트). 넘으면 오래 안 쓴 파일부터 삭제
+DISK_MAX_BYTES = int(os.getenv("MATERIAL_CACHE_DISK_BYTES", str(200 * 1024 * 1024)))
+URL_INDEX_SIZE = 4096
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class MaterialCache:
+    """
+    강의 자료에서 추출한 텍스트 캐시 (메모리 LRU + 디스크 2계층)
+
+    - 텍스트는 원본 파일의 sha256(content hash) 으로 저장 → URL 이 달라도 같은 파일이면 재사용
+    - URL 별로 ETag / Last-Modified / content hash 를 따로 기록 → 조건부 요청(304)이면 다운로드 생략
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._text_chars = 0
+        self._meta: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    # ---------------- 경로 ----------------
+    def _text_path(self, sha: str) -> Path:
+        return self.cache_dir / "text" / f"{sha}.txt"
+
+    def _meta_path(self, url: str) -> Path:
+        return self.cache_dir / "url" / f"{_url_key(url)}.json"
+
+    # ---------------- 메모리 계층 ----------------
+    def _remember_text(self, sha: str, text: str) -> None:
+        old = self._texts.pop(sha, None)
+        if old is not None:
+            self._text_chars -= len(old)
+        self._texts[sha] = text
+        self._text_chars += len(text)
+        while self._text_chars > MEMORY_MAX_CHARS and len(self._texts) > 1:
+            _, evicted = self._texts.popitem(last=False)
+            self._text_chars -= len(evicted)
+
+    def _remember_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        self._meta[url] = meta
+        self._meta.move_to_end(url)
+        while len(self._meta) > URL_INDEX_SIZE:
+            self._meta.popitem(last=False)
+
+    # ---------------- 디스크 계층 ----------------
+    def _read_file(self, path: Path) -> Optional[str]:
+        try:
+            data = path.read_text(encoding="utf-8")
+        except (FileNotFoundError, OSError):
+            return None
+        # LRU 판단용으로 사용 시각 갱신
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write_file(self, path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 같은 파일을 동시에 써도 서로의 임시 파일을 덮거나 옮겨 버리지 않게 매번 고유한 이름
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    async def _write_best_effort(self, fn, *args) -> None:
+        """디스크 계층 쓰기는 실패해도 요청을 실패시키지 않음 (메모리 계층에는 이미 반영됨)"""
+        try:
+            await asyncio.to_thread(fn, *args)
+        except OSError as e:
+            print(f"⚠ 자료 캐시 디스크 쓰기 실패: {e}")
+
+    def _evict_disk(self) -> None:
+        files = []
+        total = 0
+        for path in self.cache_dir.glob("*/*"):
+            if path.suffix == ".tmp":
+                # 다른 스레드가 쓰는 중인 임시 파일
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= DISK_MAX_BYTES:
+            return
+        for _, size, path in sorted(files):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            if total <= DISK_MAX_BYTES:
+                break
+
+    # ---------------- 공개 API ----------------
+    async def get_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        meta = self._meta.get(url)
+        if meta is not None:
+            self._meta.move_to_end(url)
+            return meta
+        raw = await asyncio.to_thread(self._read_file, self._meta_path(url))
+        if raw is None:
+            return None
+        try:
+            meta = json.loads(raw)
+        except ValueError:
+            return None
+        self._remember_meta(url, meta)
+        return meta
+
+    async def get_text(self, sha: str) -> Optional[str]:
+        text = self._texts.get(sha)
+        if text is not None:
+            self._texts.move_to_end(sha)
+            return text
+        text = await asyncio.to_thread(self._read_file, self._text_path(sha))
+        if text is not None:
+            self._remember_text(sha, text)
+        return text
+
+    async def put_text(self, sha: str, text: str) -> None:
+        self._remember_text(sha, text)
+        await self._write_best_effort(self._store_text_on_disk, sha, text)
+
+    def _store_text_on_disk(self, sha: str, text: str) -> None:
+        self._write_file(self._text_path(sha), text)
+        self._evict_disk()
+
+    async def put_meta(self, url: str, sha: str, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, Any]:
+        meta = {
+            "sha256": sha,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked_at": time.time(),
+        }
+        self._remember_meta(url, meta)
+        await self._write_best_effort(self._write_file, self._meta_path(url), json.dumps(meta))
+        return meta
+
+    async def touch_meta(self, url: str, meta: Dict[str, Any]) -> None:
+        """304 로 재검증된 경우 checked_at 만 갱신"""
+        meta = dict(meta, checked_at=time.time())
+        self._remember_meta(url, meta)
+        await self._write_best_effort(self._write_file, self._meta_path(url), json.dumps(meta))
+
+
+material_cache = MaterialCache()
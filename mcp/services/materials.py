@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from services import extractor, metrics, profiling
+from services.http import get_http_client
+from services.material_cache import material_cache
+from services.singleflight import SingleFlight
+
+# 이 시간(초) 안에 확인한 URL 은 서버에 다시 묻지 않고 캐시를 그대로 사용
+REVALIDATE_AFTER = float(os.getenv("MATERIAL_REVALIDATE_SECONDS", "300"))
+# 동시에 받는 파일 수 / 파일 하나(다운로드 + 파싱)에 허용하는 시간(초)
+FETCH_CONCURRENCY = int(os.getenv("MATERIAL_FETCH_CONCURRENCY", "6"))
+FILE_TIMEOUT = float(os.getenv("MATERIAL_FILE_TIMEOUT", "30"))
+# 파일 하나의 최대 크기 / 이 크기를 넘으면 메모리 대신 임시 파일로 받음
+MAX_BYTES = int(os.getenv("MATERIAL_MAX_BYTES", str(100 * 1024 * 1024)))
+SPILL_THRESHOLD = int(os.getenv("MATERIAL_SPILL_BYTES", str(4 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+# ---------------- 다운로드 ----------------
+class Download:
+    """
+    스트리밍으로 받은 파일. SPILL_THRESHOLD 이하는 메모리(data),
+    그보다 크면 임시 파일(path)에 있고, sha256 은 받으면서 계산해 둔다.
+    """
+
+    def __init__(self, status: int, headers: httpx.Headers):
+        self.status = status
+        self.headers = headers
+        self.sha256: Optional[str] = None
+        self.size = 0
+        self.data: Optional[bytes] = None
+        self.path: Optional[str] = None
+
+    @property
+    def source(self) -> extractor.Source:
+        return self.path if self.path is not None else self.data
+
+    def cleanup(self) -> None:
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+async def _download_file(url: str, headers: Optional[Dict[str, str]] = None) -> Download:
+    """
+    청크 단위로 받으면서 MAX_BYTES 를 넘으면 중단하고,
+    SPILL_THRESHOLD 를 넘는 순간부터는 메모리 대신 임시 파일에 쓴다.
+    """
+    with metrics.upstream("download", "revalidate" if headers else "get"):
+        return await _stream_to_download(url, headers)
+
+
+async def _stream_to_download(url: str, headers: Optional[Dict[str, str]]) -> Download:
+    async with get_http_client().stream("GET", url, headers=headers) as r:
+        dl = Download(r.status_code, r.headers)
+        if r.status_code == 304:
+            return dl
+        if r.status_code != 200:
+            raise RuntimeError(f"다운로드 실패({r.status_code})")
+
+        length = r.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_BYTES:
+            raise RuntimeError(f"파일이 너무 큽니다({int(length)} bytes > {MAX_BYTES})")
+
+        hasher = hashlib.sha256()
+        buf = bytearray()
+        fh = None
+        try:
+            async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                dl.size += len(chunk)
+                if dl.size > MAX_BYTES:
+                    raise RuntimeError(f"파일이 너무 큽니다(> {MAX_BYTES} bytes)")
+                hasher.update(chunk)
+
+                if fh is None and len(buf) + len(chunk) > SPILL_THRESHOLD:
+                    fh = tempfile.NamedTemporaryFile(
+                        prefix="sturoom-", suffix=os.path.splitext(url)[1][:8], delete=False
+                    )
+                    dl.path = fh.name
+                    fh.write(buf)
+                    buf = bytearray()
+                if fh is not None:
+                    fh.write(chunk)
+                else:
+                    buf.extend(chunk)
+        except BaseException:
+            if fh is not None:
+                fh.close()
+            dl.cleanup()
+            raise
+
+        if fh is not None:
+            fh.close()
+        else:
+            dl.data = bytes(buf)
+        dl.sha256 = hasher.hexdigest()
+        return dl
+
+
+# ---------------- 캐시를 거친 텍스트 로드 ----------------
+# URL 별 진행 중인 로드 (동시에 같은 자료를 요청하면 다운로드·추출은 한 번만)
+_loads = SingleFlight()
+
+
+async def load_text(url: str) -> Tuple[str, str]:
+    """
+    강의 자료 URL → (파일명, 추출 텍스트)
+
+    1) 최근에 확인한 URL 이면 네트워크 없이 캐시 반환
+    2) ETag / Last-Modified 로 조건부 요청 → 304 면 다운로드·파싱 생략
+    3) 새로 받은 파일도 content hash 가 같으면 파싱 생략
+    같은 URL 을 동시에 요청하면 먼저 온 요청의 결과를 같이 기다린다.
+    (한 요청이 타임아웃으로 빠져도 로드는 계속되고 나머지 요청은 결과를 받음)
+    """
+    return await _loads.do(url, lambda: _load_text(url))
+
+
+async def _load_text(url: str) -> Tuple[str, str]:
+    fname = url.split("/")[-1].lower()
+    meta = await material_cache.get_meta(url)
+
+    if meta is not None:
+        text = await material_cache.get_text(meta["sha256"])
+        if text is not None:
+            if time.time() - meta.get("checked_at", 0) < REVALIDATE_AFTER:
+                return fname, text
+
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            if headers:
+                dl = await _download_file(url, headers=headers)
+                if dl.status == 304:
+                    await material_cache.touch_meta(url, meta)
+                    return fname, text
+                return fname, await _store(url, fname, dl)
+
+    dl = await _download_file(url)
+    if dl.status != 200:
+        # 조건부 헤더 없이 304 가 오는 경우는 없어야 하지만 방어적으로 처리
+        raise RuntimeError(f"다운로드 실패({dl.status})")
+    return fname, await _store(url, fname, dl)
+
+
+async def _store(url: str, fname: str, dl: Download) -> str:
+    try:
+        text = await material_cache.get_text(dl.sha256)
+        if text is None:
+            # CPU 작업이라 프로세스 풀에서 (큰 PDF 는 페이지 구간별 병렬, 임시 파일은 mmap 으로)
+            kind = extractor.detect_kind(fname, dl.source)
+            with metrics.EXTRACT_LATENCY.time(kind=kind), profiling.span(f"extract {kind}", file=fname):
+                text = await extractor.extract_text(fname, dl.source)
+            await material_cache.put_text(dl.sha256, text)
+    finally:
+        dl.cleanup()
+
+    await material_cache.put_meta(url, dl.sha256, dl.headers.get("etag"), dl.headers.get("last-modified"))
+    return text
+
+
+async def load_many(urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    여러 자료를 동시에 불러온다 (동시 FETCH_CONCURRENCY 개, 파일별 FILE_TIMEOUT).
+    한 파일이 실패해도 나머지는 계속 진행하고, 입력 순서대로 결과를 돌려준다.
+
+        [{"url", "fname", "text"} | {"url", "fname", "error"}]
+    """
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def _one(url: str) -> Dict[str, Any]:
+        fname = url.split("/")[-1].lower()
+        try:
+            async with sem:
+                fname, text = await asyncio.wait_for(load_text(url), timeout=FILE_TIMEOUT)
+            return {"url": url, "fname": fname, "text": text}
+        except asyncio.TimeoutError:
+            return {"url": url, "fname": fname, "error": f"시간 초과({FILE_TIMEOUT:g}초)"}
+        except Exception as e:
+            return {"url": url, "fname": fname, "error": str(e) or e.__class__.__name__}
+
+    return await asyncio.gather(*[_one(u) for u in urls])
@@ -0,0 +1,268 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from services import profiling
+
+# ---------------- 설정 ----------------
+# 초 단위 기본 버킷 (5ms ~ 2분). DB 호출부터 LLM 생성까지 한 히스토그램 체계로 본다
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry: List["_Metric"] = []
+# 스레드(to_thread)에서 기록해도 값이 섞이지 않게
+_lock = threading.Lock()
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with _lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{self._labels(k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label → (버킷별 개수(누적 아님), 합계, 개수)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            counts, total, n = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> List[str]:
+        with _lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = self._header()
+        for key, (counts, total, n) in items:
+            acc = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                acc += count
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _fmt(bound)))} {acc}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {n}")
+        return lines
+
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- 앱 지표 ----------------
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP 요청 수", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "처리 중인 HTTP 요청 수")
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "외부 호출 시간 (supabase: 테이블.동작, openai: chat:모델, download: get/revalidate)",
+    ("upstream", "operation"),
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "실패한 외부 호출 수 (예외 또는 HTTP 4xx/5xx)", ("upstream", "operation"))
+
+LLM_TOKENS = Counter("llm_tokens_total", "LLM 사용 토큰 수", ("model", "kind"))
+
+STAGE_LATENCY = Histogram("pipeline_stage_duration_seconds", "파이프라인 단계별 시간", ("pipeline", "stage"))
+EXTRACT_LATENCY = Histogram("material_extract_duration_seconds", "자료 텍스트 추출(파싱) 시간", ("kind",))
+
+
+def _observe_upstream(upstream: str, operation: str, seconds: float, error: bool) -> None:
+    UPSTREAM_LATENCY.observe(seconds, upstream=upstream, operation=operation)
+    if error:
+        UPSTREAM_ERRORS.inc(upstream=upstream, operation=operation)
+
+
+def record_upstream(upstream: str, operation: str, seconds: float, error: bool = False) -> None:
+    _observe_upstream(upstream, operation, seconds, error)
+    # 프로파일링 중인 요청이면 span 트리에도 (방금 끝난 구간으로)
+    profiling.record(f"{upstream} {operation}", seconds, **({"error": True} if error else {}))
+
+
+@contextmanager
+def upstream(name: str, operation: str) -> Iterator[None]:
+    """with 블록 시간을 외부 호출 지표로 기록 (예외가 나가면 실패로 집계)"""
+    with profiling.span(f"{name} {operation}") as span:
+        t0 = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            _observe_upstream(name, operation, time.perf_counter() - t0, error)
+            if error and span is not None:
+                span.attrs["error"] = True
+
+
+def record_tokens(model: str, usage) -> None:
+    """OpenAI 응답의 usage(prompt_tokens / completion_tokens) 를 토큰 카운터에 더함"""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        n = getattr(usage, f"{kind}_tokens", None)
+        if n:
+            LLM_TOKENS.inc(n, model=model, kind=kind)
+
+
+class StageTimer:
+    """
+    단계가 바뀔 때마다 이전 단계 시간을 STAGE_LATENCY 에 기록
+    (프로파일링 중인 요청이면 단계별 span 도 열어 그 안의 외부 호출이 단계 아래에 묶인다)
+
+        timer = StageTimer("quiz")
+        timer.enter("loading"); ...; timer.enter("generating"); ...; timer.close()
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self._stage: Optional[str] = None
+        self._t0 = 0.0
+        self._spans = profiling.StageSpans(pipeline)
+
+    def _observe(self) -> None:
+        if self._stage is not None:
+            STAGE_LATENCY.observe(time.perf_counter() - self._t0, pipeline=self.pipeline, stage=self._stage)
+            self._stage = None
+
+    def enter(self, stage: str) -> None:
+        self._observe()
+        self._spans.enter(stage)
+        self._stage = stage
+        self._t0 = time.perf_counter()
+
+    def close(self) -> None:
+        self._observe()
+        self._spans.close()
+
+
+# ---------------- 미들웨어 ----------------
+def _route_template(scope) -> str:
+    """매칭된 라우트의 경로 템플릿 (/api/quiz/jobs/{job_id}). 매칭 실패면 "unmatched" """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None and not regex.match(path):
+        # FastAPI 버전에 따라 include_router 한 라우트는 prefix 를 뺀 경로만 가짐 → 매칭된 앞부분을 붙임
+        for i, ch in enumerate(path):
+            if ch == "/" and i and regex.match(path[i:]):
+                return path[:i] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    라우트(경로 템플릿)별 처리 시간·상태 코드 집계 (순수 ASGI → SSE 는 스트림이 끝날 때까지 잰다)
+    매칭되는 라우트가 없으면 route="unmatched" 로 묶어 경로별로 지표가 늘어나지 않게 한다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = time.perf_counter() - t0
+            HTTP_IN_FLIGHT.dec()
+            # 라우터가 매칭한 라우트를 scope 에 남김 (FastAPI APIRoute)
+            route = _route_template(scope)
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from services.attendance_buffer import attendance_buffer, split_by_kst_day
+from services.kst import KST
+
+# ---------------- 설정 ----------------
+# 마지막 ping 이후 이 시간(초)이 지나면 자리를 비운 것으로 보고 더 이상 시간을 쌓지 않음
+IDLE_GRACE = float(os.getenv("PRESENCE_IDLE_GRACE", "45"))
+# 접속 중인 사용자들의 누적 시간을 출석 버퍼로 넘기는 주기(초)
+ACCRUE_INTERVAL = float(os.getenv("PRESENCE_ACCRUE_INTERVAL", "10"))
+
+
+class _Session:
+    def __init__(self, user_id: str, now: float):
+        self.user_id = user_id
+        self.last_seen = now
+        self.active = True
+        self.idle_at = now
+
+    def active_until(self, now: float) -> float:
+        if self.active:
+            return min(now, self.last_seen + IDLE_GRACE)
+        return self.idle_at
+
+
+class _UserState:
+    def __init__(self, now: float):
+        self.sessions: Set[_Session] = set()
+        # 이 시각까지는 이미 출석 시간으로 반영됨
+        self.credited_until = now
+
+    def end(self, now: float) -> float:
+        return max((s.active_until(now) for s in self.sessions), default=self.credited_until)
+
+
+class PresenceTracker:
+    """
+    WebSocket 연결 단위로 접속 상태를 서버에서 추적하고,
+    실제로 활성 상태였던 시간만 attendance_logs 로 반영한다.
+
+    - 연결 = 세션 1회 (session_count 를 접속 시점에 정확히 +1)
+    - 같은 사용자의 여러 탭은 시간이 겹치므로 사용자 단위로 한 번만 집계
+    - ping 이 끊기거나 active=false 가 오면 그 시점 이후는 집계하지 않음
+    """
+
+    def __init__(self, accrue_interval: float = ACCRUE_INTERVAL):
+        self.accrue_interval = accrue_interval
+        self._users: Dict[str, _UserState] = {}
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------- 내부 집계 ----------------
+    def _collect(self, user_id: str, now: float) -> None:
+        """credited_until 이후 활성 구간을 날짜별 pending 에 쌓는다"""
+        state = self._users.get(user_id)
+        if state is None:
+            return
+        end = state.end(now)
+        if end > state.credited_until:
+            start_dt = datetime.fromtimestamp(state.credited_until, tz=KST)
+            end_dt = datetime.fromtimestamp(end, tz=KST)
+            credited = 0
+            for day, seconds in split_by_kst_day(start_dt, end_dt).items():
+                key = (user_id, day)
+                self._pending[key] = self._pending.get(key, 0) + seconds
+                credited += seconds
+            # 초 단위로 잘린 나머지는 버리지 않고 다음 집계로 넘김
+            state.credited_until += credited
+
+    def _resume(self, user_id: str, now: float) -> None:
+        """비활성 구간(자리 비움, 끊김)은 건너뛰고 지금부터 다시 집계"""
+        self._collect(user_id, now)
+        state = self._users[user_id]
+        if state.end(now) < now:
+            state.credited_until = now
+
+    # ---------------- 연결 수명주기 ----------------
+    async def connect(self, user_id: str) -> _Session:
+        now = time.time()
+        state = self._users.setdefault(user_id, _UserState(now))
+        self._resume(user_id, now)
+        session = _Session(user_id, now)
+        state.sessions.add(session)
+
+        today = datetime.fromtimestamp(now, tz=KST).date().isoformat()
+        try:
+            await attendance_buffer.add(user_id, today, 0, sessions=1)
+        except BaseException:
+            # 세션 수 반영에 실패하면 등록도 되돌림 (남아 있으면 계속 접속 중으로 집계됨)
+            self.disconnect(session)
+            raise
+        return session
+
+    def ping(self, session: _Session, active: bool = True) -> None:
+        now = time.time()
+        if active:
+            if not session.active or session.active_until(now) < now:
+                self._resume(session.user_id, now)
+            session.active = True
+            session.last_seen = now
+        elif session.active:
+            session.idle_at = session.active_until(now)
+            session.active = False
+            session.last_seen = now
+
+    def disconnect(self, session: _Session) -> None:
+        """종료 시점까지의 시간을 pending 에 넣어 두고 세션 제거 (다음 주기에 반영)"""
+        now = time.time()
+        user_id = session.user_id
+        self._collect(user_id, now)
+        state = self._users.get(user_id)
+        if state is not None:
+            state.sessions.discard(session)
+            if not state.sessions:
+                self._users.pop(user_id, None)
+
+    def connected_users(self) -> int:
+        return len(self._users)
+
+    # ---------------- 출석 버퍼로 반영 ----------------
+    async def flush(self) -> None:
+        now = time.time()
+        for user_id in list(self._users):
+            self._collect(user_id, now)
+        pending, self._pending = self._pending, {}
+        if pending:
+            try:
+                await attendance_buffer.add_many(pending, explicit_sessions=True)
+            except Exception:
+                # 다음 주기에 다시 넘기도록 되돌려 둠
+                for key, seconds in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + seconds
+                raise
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.accrue_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠ presence 집계 실패: {e}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """종료 시 루프를 멈추고 접속 중인 사용자의 시간을 버퍼로 넘김 (버퍼 stop 전에 호출)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+presence = PresenceTracker()
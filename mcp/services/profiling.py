@@ -0,0 +1,333 @@
+import asyncio
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+# ---------------- 설정 ----------------
+# 이 토큰을 HEADER 로 보낸 요청만 프로파일링 (미설정이면 기능 전체 비활성)
+TOKEN = os.getenv("PROFILE_TOKEN")
+HEADER = "x-debug-profile"
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", Path(tempfile.gettempdir()) / "sturoom-profiles"))
+
+# 이벤트 루프가 다음 이벤트를 기다리는 중인 샘플 (CPU 를 쓰지 않음)
+_IDLE_FUNCS = {"select", "poll", "epoll", "control"}
+
+
+def authorized(value: Optional[str]) -> bool:
+    return bool(TOKEN) and secrets.compare_digest(value or "", TOKEN)
+
+
+# ---------------- span 트리 ----------------
+class Span:
+    __slots__ = ("name", "start", "end", "attrs", "children")
+
+    def __init__(self, name: str, start: float, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.attrs = attrs or {}
+        self.children: List["Span"] = []
+
+    def duration(self, now: float) -> float:
+        return (self.end if self.end is not None else now) - self.start
+
+    def to_dict(self, origin: float, now: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration(now) * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [c.to_dict(origin, now) for c in self.children]} if self.children else {}),
+        }
+
+
+# 현재 요청(태스크)의 span. gather/create_task 로 만든 태스크는 생성 시점 값을 물려받는다
+_current: ContextVar[Optional[Span]] = ContextVar("profile_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """프로파일링 중인 요청이면 현재 span 아래에 자식 span 을 열고, 아니면 아무것도 하지 않음"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name, time.perf_counter(), attrs)
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+def detach() -> None:
+    """현재 태스크를 프로파일에서 떼어냄 (요청과 따로 도는 백그라운드 작업용)"""
+    _current.set(None)
+
+
+def record(name: str, seconds: float, **attrs: Any) -> None:
+    """이미 끝난 구간(직접 잰 시간)을 현재 span 의 자식으로 추가"""
+    parent = _current.get()
+    if parent is None:
+        return
+    end = time.perf_counter()
+    s = Span(name, end - seconds, attrs)
+    s.end = end
+    parent.children.append(s)
+
+
+async def traced(name: str, aw: Awaitable[T]) -> T:
+    """gather 에 넘기는 코루틴을 span 으로 감쌈 (각 태스크가 자기 span 아래에 기록)"""
+    with span(name):
+        return await aw
+
+
+class StageSpans:
+    """
+    순차 단계를 형제 span 으로 (enter 할 때 이전 단계를 닫음).
+    단계 안에서 생긴 span(Supabase/OpenAI 호출 등)은 그 단계의 자식이 된다.
+    """
+
+    def __init__(self, name: str):
+        self._parent = _current.get()
+        self._root: Optional[Span] = None
+        self._stage: Optional[Span] = None
+        if self._parent is not None:
+            self._root = Span(name, time.perf_counter())
+            self._parent.children.append(self._root)
+
+    def enter(self, stage: str) -> None:
+        if self._root is None:
+            return
+        self._end_stage()
+        self._stage = Span(stage, time.perf_counter())
+        self._root.children.append(self._stage)
+        _current.set(self._stage)
+
+    def _end_stage(self) -> None:
+        if self._stage is not None:
+            self._stage.end = time.perf_counter()
+            self._stage = None
+
+    def close(self) -> None:
+        if self._root is None or self._root.end is not None:
+            return
+        self._end_stage()
+        self._root.end = time.perf_counter()
+        _current.set(self._parent)
+
+
+# ---------------- 샘플링 프로파일러 ----------------
+class _Sampler(threading.Thread):
+    """
+    대상 스레드(이벤트 루프)의 호출 스택을 SAMPLE_INTERVAL 마다 찍어 folded stack 으로 센다.
+    같은 루프에서 동시에 처리 중인 다른 요청의 스택도 섞일 수 있다 (결과의 concurrent_requests 참고).
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            if stack and stack[-1].split(" ", 1)[0] in _IDLE_FUNCS:
+                stack = ["(idle)"]
+            self.samples[";".join(stack)] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1.0)
+
+
+# ---------------- 요청 단위 프로파일 ----------------
+_running: Set["Profile"] = set()
+_in_flight = 0
+
+
+class Profile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.root = Span(f"{method} {path}", time.perf_counter())
+        self.max_concurrent = _in_flight
+        self.started_at = time.time()
+        self._sampler = _Sampler(threading.get_ident())
+
+    def start(self) -> None:
+        _running.add(self)
+        self._sampler.start()
+
+    def finish(self) -> None:
+        self.root.end = time.perf_counter()
+        self._sampler.stop()
+        _running.discard(self)
+
+    # ---------------- 결과물 ----------------
+    def cpu_folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self._sampler.samples.most_common())
+
+    def spans_folded(self) -> str:
+        """
+        span 트리 → folded stack (값 = 자기 시간 ms). flamegraph.pl / speedscope 에 그대로 넣을 수 있음.
+        동시에 실행된 자식들의 합이 부모보다 길면 부모의 자기 시간은 0 으로 둔다.
+        """
+        now = time.perf_counter()
+        lines: List[str] = []
+
+        def walk(s: Span, path: str) -> None:
+            here = f"{path};{s.name}" if path else s.name
+            child_total = sum(c.duration(now) for c in s.children)
+            self_ms = max(0.0, s.duration(now) - child_total) * 1000
+            if self_ms >= 0.001:
+                lines.append(f"{here} {round(self_ms, 3)}")
+            for c in s.children:
+                walk(c, here)
+
+        walk(self.root, "")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.root.duration(now) * 1000, 3),
+            # 1 보다 크면 CPU 샘플에 다른 요청의 스택도 섞여 있을 수 있음
+            "concurrent_requests": self.max_concurrent,
+            "sample_interval_ms": SAMPLE_INTERVAL * 1000,
+            "samples": sum(self._sampler.samples.values()),
+            "spans": self.root.to_dict(self.root.start, now),
+            "artifacts": {
+                "cpu": f"/debug/profiles/{self.id}/cpu.folded",
+                "spans": f"/debug/profiles/{self.id}/spans.folded",
+            },
+        }
+
+    def save(self) -> None:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        (PROFILE_DIR / f"{self.id}.cpu.folded").write_text(self.cpu_folded())
+        (PROFILE_DIR / f"{self.id}.spans.folded").write_text(self.spans_folded())
+        (PROFILE_DIR / f"{self.id}.json").write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2))
+        _prune()
+
+
+def _prune() -> None:
+    """최근 KEEP 개 프로파일만 남김"""
+    reports = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in reports[KEEP:]:
+        profile_id = old.name[: -len(".json")]
+        for suffix in (".json", ".cpu.folded", ".spans.folded"):
+            try:
+                (PROFILE_DIR / f"{profile_id}{suffix}").unlink()
+            except OSError:
+                pass
+
+
+ARTIFACTS = {"cpu.folded": ".cpu.folded", "spans.folded": ".spans.folded", "json": ".json"}
+
+
+def artifact_path(profile_id: str, kind: str) -> Optional[Path]:
+    suffix = ARTIFACTS.get(kind)
+    # id 는 우리가 만든 hex 만 허용 (경로 조작 방지)
+    if suffix is None or not profile_id.isalnum():
+        return None
+    path = PROFILE_DIR / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+# ---------------- 미들웨어 ----------------
+class ProfilingMiddleware:
+    """
+    X-Debug-Profile: <PROFILE_TOKEN> 헤더가 있는 요청만 CPU 샘플링 + span 트리를 수집해
+    PROFILE_DIR 에 저장하고, 응답 헤더 X-Profile-Id 로 조회 경로를 알려 준다 (/debug/profiles/{id}).
+    SSE 응답은 스트림이 끝날 때까지 수집. 동시에 MAX_CONCURRENT 개까지만 (초과분은 그냥 처리)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        _in_flight += 1
+        for p in _running:
+            p.max_concurrent = max(p.max_concurrent, _in_flight)
+        try:
+            profile = self._maybe_profile(scope)
+            if profile is None:
+                await self.app(scope, receive, send)
+                return
+            await self._run_profiled(profile, scope, receive, send)
+        finally:
+            _in_flight -= 1
+
+    def _maybe_profile(self, scope) -> Optional[Profile]:
+        if not TOKEN or len(_running) >= MAX_CONCURRENT:
+            return None
+        # 결과 조회 요청까지 프로파일로 남기지 않음
+        if scope.get("path", "").startswith("/debug/profiles"):
+            return None
+        headers = dict(scope.get("headers") or [])
+        value = headers.get(HEADER.encode())
+        if value is None or not authorized(value.decode("latin-1")):
+            return None
+        return Profile(scope.get("method", ""), scope.get("path", ""))
+
+    async def _run_profiled(self, profile: Profile, scope, receive, send) -> None:
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = dict(message, headers=list(message.get("headers") or []) + [
+                    (b"x-profile-id", profile.id.encode()),
+                ])
+            await send(message)
+
+        token = _current.set(profile.root)
+        profile.start()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            profile.finish()
+            _current.reset(token)
+            try:
+                await asyncio.to_thread(profile.save)
+                print(f"🔬 프로파일 저장: {profile.id} ({profile.method} {profile.path})")
+            except Exception as e:
+                print(f"⚠ 프로파일 저장 실패: {e}")
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from services import db
+from services.background import spawn
+
+# ---------------- 설정 ----------------
+# 이 기간보다 오래된 문항은 내주지 않음 (자료가 바뀌면 fingerprint 자체가 달라짐)
+FRESH_DAYS = int(os.getenv("QUIZ_BANK_FRESH_DAYS", "14"))
+# 한 문항을 이 횟수 이상 내줬으면 은퇴 (같은 문제만 반복되지 않게)
+MAX_SERVES = int(os.getenv("QUIZ_BANK_MAX_SERVES", "30"))
+# 사용 가능한 문항이 이 개수보다 적으면 백그라운드로 보충
+LOW_WATERMARK = int(os.getenv("QUIZ_BANK_LOW_WATERMARK", "9"))
+# 보충 1회에 생성하는 문항 수
+REFILL_COUNT = int(os.getenv("QUIZ_BANK_REFILL_COUNT", "9"))
+READ_LIMIT = 60
+
+_refilling: Set[Tuple[str, str]] = set()
+
+BANK_COLUMNS = ("question", "choices", "answer", "explanation")
+
+
+def fingerprint(texts: List[str]) -> str:
+    """추출 텍스트 기준 자료 묶음 식별자 (파일 순서와 URL 에 무관)"""
+    parts = sorted(hashlib.sha256(t.encode()).hexdigest() for t in texts)
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+async def take(fp: str, mode: str, count: int) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+    """
+    은행에서 count 문항을 꺼낸다 (DB 읽기 1회).
+    반환: (문항 목록 | 부족하면 None, 현재 사용 가능한 문항 수)
+
+    덜 나간 문항을 우선하되 그 안에서는 무작위로 골라 학생마다 구성이 달라지게 한다.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=FRESH_DAYS)).isoformat()
+    res = await (
+        db.quiz_bank()
+        .select("*")
+        .eq("fingerprint", fp)
+        .eq("mode", mode)
+        .gte("created_at", cutoff)
+        .lt("served_count", MAX_SERVES)
+        .order("served_count", desc=False)
+        .limit(READ_LIMIT)
+        .execute()
+    )
+    rows = res.data or []
+    if len(rows) < count:
+        return None, len(rows)
+
+    # 가장 덜 나간 쪽 후보군(최소 count*2개)에서 무작위 추출
+    floor = rows[min(len(rows), count * 2) - 1]["served_count"]
+    candidates = [r for r in rows if r["served_count"] <= floor]
+    picked = random.sample(candidates, count)
+
+    spawn(_mark_served(picked), name="quiz_bank.mark_served")
+    return [{k: r.get(k) for k in BANK_COLUMNS} for r in picked], len(rows)
+
+
+async def _mark_served(rows: List[Dict[str, Any]]) -> None:
+    # 원자적 증가는 아니지만 "덜 나간 것 우선" 용도로는 근사치면 충분
+    updated = [dict(r, served_count=(r.get("served_count") or 0) + 1) for r in rows]
+    await db.quiz_bank().upsert(updated, on_conflict="id").execute()
+
+
+async def add(fp: str, mode: str, questions: List[Dict[str, Any]], served: int = 0) -> None:
+    if not questions:
+        return
+    rows = [
+        dict({k: q.get(k) for k in BANK_COLUMNS}, fingerprint=fp, mode=mode, served_count=served)
+        for q in questions
+    ]
+    await db.quiz_bank().insert(rows).execute()
+
+
+def ensure_stock(
+    fp: str,
+    mode: str,
+    available: int,
+    generate: Callable[[], Awaitable[List[Dict[str, Any]]]],
+) -> None:
+    """사용 가능한 문항이 LOW_WATERMARK 미만이면 보충 작업을 (중복 없이) 백그라운드로 띄운다"""
+    key = (fp, mode)
+    if available >= LOW_WATERMARK or key in _refilling:
+        return
+    _refilling.add(key)
+
+    async def _refill():
+        try:
+            questions = await generate()
+            await add(fp, mode, questions)
+            print(f"🏦 문제 은행 보충: mode={mode} +{len(questions)}")
+        finally:
+            _refilling.discard(key)
+
+    spawn(_refill(), name="quiz_bank.refill")
@@ -0,0 +1,74 @@
+import itertools
+import os
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from services import kst
+from services.cache import TTLCache
+
+# ---------------- 설정 ----------------
+# 쓰기 경로에서 무효화하지 않는 값(프로필 이름 등)이 반영되기까지의 최대 시간(초)
+TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
+MAXSIZE = int(os.getenv("REPORT_CACHE_SIZE", "2048"))
+
+# 프로세스가 새로 뜨면 버전 카운터가 처음부터 다시 시작하므로 이전 ETag 와 겹치지 않게 구분값을 섞음
+_EPOCH = uuid.uuid4().hex[:8]
+# 버전 번호는 사용자와 관계없이 프로세스 전체에서 한 번만 쓰임 → 버전 항목이 밀려나도 예전 ETag 가 다시 나오지 않음
+_next_version = itertools.count(1)
+
+
+class ReportCache:
+    """
+    사용자별 /api/report/summary 응답 캐시
+
+    - 출석 flush, 퀴즈 채점/런 생성처럼 리포트 값이 바뀌는 쓰기 경로에서 bump(user_id) 로 버전을 올림
+    - ETag = (프로세스 구분값, 사용자 버전, 오늘 날짜(KST)) → 날짜가 바뀌면 streak/trend 때문에 자동으로 새 값
+    - 사용자 버전도 개수·TTL 제한 캐시에 보관. 밀려나거나 만료되면 새 번호를 받으므로 캐시 미스로만 끝남
+    - 이벤트 루프 한 곳에서만 사용 (버퍼·라우터 모두 루프 스레드에서 호출)
+    """
+
+    def __init__(self, ttl: float = TTL, maxsize: int = MAXSIZE):
+        self._versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._bodies = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _version(self, user_id: str) -> int:
+        version = self._versions.get(user_id)
+        if version is None:
+            version = next(_next_version)
+            self._versions.set(user_id, version)
+        return version
+
+    def etag(self, user_id: str) -> str:
+        return f'W/"{_EPOCH}-{self._version(user_id)}-{kst.today().isoformat()}"'
+
+    def bump(self, user_id: str) -> None:
+        self._versions.set(user_id, next(_next_version))
+        self._bodies.pop(user_id)
+
+    def bump_many(self, user_ids: Iterable[str]) -> None:
+        for user_id in set(user_ids):
+            self.bump(user_id)
+
+    def get(self, user_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """현재 버전과 같은 ETag 로 저장된 응답만 돌려준다"""
+        item = self._bodies.get(user_id)
+        if item is None or item[0] != self.etag(user_id):
+            return None
+        return item
+
+    def set(self, user_id: str, etag: str, body: Dict[str, Any]) -> None:
+        # 계산하는 동안 bump 됐으면 저장하지 않음 (다음 요청에서 새로 계산)
+        if etag == self.etag(user_id):
+            self._bodies.set(user_id, (etag, body))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # W/ 접두사 유무와 관계없이 비교 (weak comparison)
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in tags or any((t[2:] if t.startswith("W/") else t) == bare for t in tags)
+
+
+report_cache = ReportCache()
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출은 작업 하나를 같이 기다린다 (다운로드·LLM 요약·JWKS 조회 등)
+
+    - 작업은 처음 온 호출자와 분리된 task 로 실행 → 한 호출자가 취소(타임아웃)돼도
+      작업은 계속되고, 같이 기다리던 다른 호출자에게 CancelledError 가 퍼지지 않음
+    - 작업이 끝나면(성공/실패) 키를 지움. 실패는 공유하지만 남겨 두지 않으므로 다음 호출이 다시 시도
+    - 이벤트 루프 한 곳에서만 사용
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # 기다리던 호출자가 모두 취소됐어도 "exception was never retrieved" 경고가 나지 않게
+            task.exception()
@@ -0,0 +1,8 @@
+import json
+from typing import Optional
+
+
+def event(data: dict, name: Optional[str] = None) -> str:
+    """text/event-stream 한 건 (name 이 있으면 event: 줄을 붙임)"""
+    head = f"event: {name}\n" if name else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
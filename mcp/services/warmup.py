@@ -0,0 +1,27 @@
+import asyncio
+import os
+
+from services import db, llm
+
+# ---------------- 설정 ----------------
+# 1 이면 앱 시작 직후 백그라운드에서 무거운 의존성과 공용 클라이언트를 미리 준비 (상시 실행 서버, Render 등)
+# 서버리스(Lambda)처럼 콜드 스타트가 중요한 곳에서는 끄고 첫 사용 때 불러온다
+ENABLED = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+
+def import_heavy() -> None:
+    """첫 요청으로 미뤄 둔 import 를 한 번에 (스레드에서 실행해도 됨)"""
+    import jwt.algorithms  # noqa: F401  (cryptography 포함)
+    import openai  # noqa: F401
+    import postgrest  # noqa: F401
+
+
+async def warm_up() -> None:
+    """
+    import 는 스레드에서 (이벤트 루프를 막지 않게),
+    클라이언트 생성은 루프에서 (get_client 의 생성 여부 확인이 스레드와 겹치지 않게)
+    """
+    await asyncio.to_thread(import_heavy)
+    llm.get_client()
+    db.get_client()
+    print("🔥 warm-up 완료 (openai / postgrest / jwt)")
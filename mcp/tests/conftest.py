@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# 앱 코드는 mcp/ 기준으로 import (services.*, routes.*)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# config.py 가 import 시점에 확인하는 값 (실제 외부 호출은 테스트마다 가짜로 대체)
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
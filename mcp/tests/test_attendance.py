@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import attendance
+from services.attendance_buffer import AttendanceBuffer
+
+
+@pytest.fixture
+def client(monkeypatch):
+    added = []
+
+    async def fake_add(user_id, day, seconds, sessions=None):
+        added.append((user_id, day, seconds))
+        return {"seconds": seconds, "session_count": 1}
+
+    monkeypatch.setattr(attendance.attendance_buffer, "add", fake_add)
+    app = FastAPI()
+    app.include_router(attendance.router, prefix="/attendance")
+    return TestClient(app), added
+
+
+@pytest.mark.parametrize("seconds", [True, False, -1, 86401, "abc", None, [1]])
+def test_log_rejects_invalid_seconds(client, seconds):
+    c, added = client
+    res = c.post("/attendance/log", json={"user_id": "u1", "seconds": seconds})
+    assert res.status_code == 400
+    assert added == []
+
+
+def test_log_accepts_valid_seconds(client):
+    c, added = client
+    res = c.post("/attendance/log", json={"user_id": "u1", "seconds": 30})
+    assert res.status_code == 200
+    assert added[0][2] == 30
+
+
+def test_second_buffer_on_same_host_refuses_to_start(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.attendance_buffer.LOCK_WAIT", 0.1)
+    lock_path = str(tmp_path / "attendance.lock")
+
+    async def main():
+        first = AttendanceBuffer(lock_path=lock_path)
+        second = AttendanceBuffer(lock_path=lock_path)
+        await first.start()
+        try:
+            with pytest.raises(RuntimeError):
+                await second.start()
+        finally:
+            await first.stop()
+        # 먼저 뜬 프로세스가 멈추면(재시작) 다음 프로세스는 시작할 수 있음
+        await second.start()
+        await second.stop()
+
+    asyncio.run(main())
+
+
+def test_multiple_workers_config_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    buffer = AttendanceBuffer(lock_path=str(tmp_path / "attendance.lock"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(buffer.start())
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
+
+from services import background, db
+
+
+class _FakePostgrest:
+    """요청을 받아 행을 저장하고, 처음 n 번은 커밋한 뒤 응답 대신 읽기 타임아웃을 내는 가짜 PostgREST"""
+
+    def __init__(self, timeouts=0, error=None):
+        self.rows = {}
+        self.requests = []
+        self.timeouts = timeouts
+        self.error = error
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.error is not None:
+            return httpx.Response(self.error[0], json=self.error[1])
+        body = json.loads(request.content)
+        inserted = []
+        for row in body if isinstance(body, list) else [body]:
+            if "ignore-duplicates" in request.headers.get("prefer", "") and row["id"] in self.rows:
+                continue
+            self.rows[row["id"]] = row
+            inserted.append(row)
+        if self.timeouts:
+            self.timeouts -= 1
+            raise httpx.ReadTimeout("응답 유실", request=request)
+        return httpx.Response(201, json=inserted)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(server):
+        client = AsyncPostgrestClient(
+            "http://db.test/rest/v1",
+            http_client=httpx.AsyncClient(base_url="http://db.test/rest/v1", transport=httpx.MockTransport(server)),
+        )
+        monkeypatch.setattr(db, "_client", client)
+        monkeypatch.setattr(background.random, "uniform", lambda a, b: 0)
+        return server
+
+    return install
+
+
+def test_retried_insert_once_does_not_duplicate(fake_db):
+    server = fake_db(_FakePostgrest(timeouts=1))
+    rows = [{"user_id": "u", "question_id": "q1"}, {"user_id": "u", "question_id": "q2"}]
+
+    asyncio.run(background.retry(lambda: db.insert_once("quiz_answers", rows).execute()))
+
+    assert len(server.requests) == 2
+    assert len(server.rows) == 2
+    assert server.requests[0].url.params["on_conflict"] == "id"
+    # 재시도는 같은 id 로
+    sent = [[r["id"] for r in json.loads(req.content)] for req in server.requests]
+    assert sent[0] == sent[1]
+
+
+def test_client_errors_are_not_retried(fake_db):
+    server = fake_db(_FakePostgrest(error=(409, {"code": "23503", "message": "foreign key violation"})))
+
+    with pytest.raises(APIError):
+        asyncio.run(background.retry(lambda: db.insert_once("quiz_answers", {"user_id": "u"}).execute()))
+    assert len(server.requests) == 1
+
+
+def test_is_retryable():
+    request = httpx.Request("POST", "http://db.test")
+    assert db.is_retryable(httpx.ConnectError("down", request=request))
+    assert db.is_retryable(APIError({"code": "40001", "message": "serialization failure"}))
+    assert db.is_retryable(APIError({"code": "PGRST001", "message": "no connection"}))
+    assert db.is_retryable(APIError({"code": 502, "message": "JSON could not be generated"}))
+    assert not db.is_retryable(APIError({"code": "23505", "message": "duplicate key"}))
+    assert not db.is_retryable(APIError({"code": "PGRST204", "message": "column not found"}))
+    assert not db.is_retryable(APIError({"code": 400, "message": "JSON could not be generated"}))
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import anyio
+
+from services import llm
+
+
+class _FakeStream:
+    """첫 청크 뒤로는 멈춰 있는(응답 대기 중인) 가짜 OpenAI 스트림. close() 에도 await 지점이 있음"""
+
+    def __init__(self):
+        self.closed = False
+        self.sent = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent:
+            await asyncio.Event().wait()
+        self.sent += 1
+        delta = SimpleNamespace(content="x")
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+def _fake_client(streams):
+    async def create(**kwargs):
+        stream = _FakeStream()
+        streams.append(stream)
+        return stream
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def _use_fake(monkeypatch, model):
+    streams = []
+    monkeypatch.setattr(llm, "get_client", lambda: _fake_client(streams))
+    monkeypatch.setitem(llm._semaphores, model, asyncio.Semaphore(8))
+    return streams
+
+
+async def _consume(model):
+    async for _ in llm.stream_chat_completion(model, [{"role": "user", "content": "hi"}]):
+        pass
+
+
+def test_cancelled_stream_releases_semaphore(monkeypatch):
+    model = "test-model"
+
+    async def main():
+        streams = _use_fake(monkeypatch, model)
+        for _ in range(3):
+            task = asyncio.create_task(_consume(model))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return streams
+
+    streams = asyncio.run(main())
+    assert llm._semaphores[model]._value == 8
+    assert len(streams) == 3 and all(s.closed for s in streams)
+
+
+def test_anyio_cancelled_stream_releases_semaphore(monkeypatch):
+    # Starlette 는 클라이언트 연결이 끊기면 anyio cancel scope 로 스트림을 취소함
+    model = "test-model-anyio"
+
+    async def main():
+        streams = _use_fake(monkeypatch, model)
+        for _ in range(3):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(_consume, model)
+                await anyio.sleep(0.01)
+                tg.cancel_scope.cancel()
+        return streams
+
+    streams = asyncio.run(main())
+    assert llm._semaphores[model]._value == 8
+    assert len(streams) == 3 and all(s.closed for s in streams)
+
+
+def test_close_error_releases_semaphore(monkeypatch):
+    model = "test-model-close-error"
+
+    async def broken_close():
+        raise RuntimeError("connection reset")
+
+    async def main():
+        streams = _use_fake(monkeypatch, model)
+        agen = llm.stream_chat_completion(model, [{"role": "user", "content": "hi"}])
+        await agen.__anext__()
+        streams[0].close = broken_close
+        await agen.aclose()
+
+    asyncio.run(main())
+    assert llm._semaphores[model]._value == 8
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from routes import report
+from services import kst
+
+
+def test_ai_summary_waiters_survive_leader_cancel(monkeypatch):
+    calls = []
+
+    async def fake_generate(user_data):
+        calls.append(user_data)
+        await asyncio.sleep(0.05)
+        return {"summary": "ok"}
+
+    monkeypatch.setattr(report, "_generate_ai_summary", fake_generate)
+    monkeypatch.setattr(report._ai_cache, "_data", type(report._ai_cache._data)())
+    data = {"user": "u1", "score": 80}
+
+    async def main():
+        leader = asyncio.create_task(report._cached_ai_summary(data))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(report._cached_ai_summary(data))
+        await asyncio.sleep(0.01)
+        # 먼저 온 요청의 연결이 끊김
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == {"summary": "ok"}
+    assert len(calls) == 1
+    assert report._ai_cache.get(report._ai_summary_key(data)) == {"summary": "ok"}
+
+
+class _FakeQuery:
+    """get_attendance_summary 가 쓰는 PostgREST 체인(eq/gte/lte/order)만 흉내 내는 가짜"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, *_):
+        return self
+
+    def order(self, *_, **__):
+        return self
+
+    def eq(self, col, value):
+        return _FakeQuery([r for r in self.rows if r[col] == value])
+
+    def gte(self, col, value):
+        return _FakeQuery([r for r in self.rows if r[col] >= value])
+
+    def lte(self, col, value):
+        return _FakeQuery([r for r in self.rows if r[col] <= value])
+
+    async def execute(self):
+        return SimpleNamespace(data=self.rows)
+
+
+def test_attendance_summary_uses_kst_day(monkeypatch):
+    # 2026-03-01 00:30 KST = 2026-02-28 15:30 UTC → UTC 서버의 로컬 날짜는 아직 전날
+    monkeypatch.setattr(kst, "now", lambda: datetime(2026, 3, 1, 0, 30, tzinfo=kst.KST))
+    rows = [
+        {"user_id": "u1", "date": "2026-02-28", "seconds": 600, "session_count": 1},
+        {"user_id": "u1", "date": "2026-03-01", "seconds": 120, "session_count": 1},
+    ]
+    monkeypatch.setattr(report.db, "attendance_logs", lambda: _FakeQuery(rows))
+
+    async def fake_rollup(user_id):
+        return {
+            "days": 2, "total_seconds": 720, "total_sessions": 2,
+            "first_date": date(2026, 2, 28), "last_date": date(2026, 3, 1),
+            "current_streak": 2, "best_streak": 2,
+        }
+
+    monkeypatch.setattr(report.attendance_rollups, "get", fake_rollup)
+
+    summary = asyncio.run(report.get_attendance_summary("u1"))
+    assert summary["today_seconds"] == 120
+    assert summary["current_streak"] == 2
+    assert summary["trend"][-2:] == [10, 2]
+    assert {"date": "2026-03-01", "seconds": 120} in summary["daily"]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from services import materials
+from services.singleflight import SingleFlight
+
+
+def test_leader_timeout_does_not_cancel_followers():
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flight = SingleFlight()
+        leader = asyncio.wait_for(flight.do("k", slow), timeout=0.01)
+        follower = flight.do("k", slow)
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return results, "k" in flight
+
+    (leader, follower), still_running = asyncio.run(main())
+    assert isinstance(leader, asyncio.TimeoutError)
+    assert follower == "done"
+    assert calls == [1]
+    assert not still_running
+
+
+def test_failure_is_shared_but_not_kept():
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise ValueError("bad")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(flight.do("k", boom), flight.do("k", boom), return_exceptions=True)
+        with pytest.raises(ValueError):
+            await flight.do("k", boom)
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(calls) == 2
+
+
+def test_load_many_timeout_does_not_break_concurrent_load(monkeypatch):
+    async def fake_load(url):
+        await asyncio.sleep(0.05)
+        return url.split("/")[-1], "text"
+
+    monkeypatch.setattr(materials, "_load_text", fake_load)
+    monkeypatch.setattr(materials, "FILE_TIMEOUT", 0.01)
+
+    async def follower():
+        # load_many 쪽 로드가 먼저 시작된 뒤에 같은 URL 을 요청
+        await asyncio.sleep(0.005)
+        return await materials.load_text("http://h/a.pdf")
+
+    async def main():
+        # load_many 은 파일별 타임아웃으로 빠지고, 같은 URL 을 기다리던 다른 요청은 결과를 받아야 함
+        return await asyncio.gather(materials.load_many(["http://h/a.pdf"]), follower())
+
+    many, single = asyncio.run(main())
+    assert "error" in many[0]
+    assert single == ("a.pdf", "text")
@@ -194,9 +194,10 @@ export default function ReportPage() {
         }
 
         // 1️⃣ summary 먼저 가져오기
+        // no-cache: 브라우저가 저장해 둔 응답을 ETag 로 재검증 (변경 없으면 304)
         const res = await fetch(
           `http://127.0.0.1:5000/api/report/summary?user_id=${userId}`,
-          { cache: "no-store" }
+          { cache: "no-cache" }
         );
 
         if (!res.ok) {
@@ -4,39 +4,114 @@ import { useEffect, useRef } from "react";
 import axios from "axios";
 import { useSupabase } from "@/app/providers/SupabaseProvider";
 
+const API_BASE =
+  process.env.NEXT_PUBLIC_API_BASE_URL || "http://127.0.0.1:5000";
+
+// 서버 PRESENCE_IDLE_GRACE(45초)보다 짧게
+const PING_INTERVAL_MS = 15000;
+// WebSocket 을 못 쓸 때 모아서 보내는 주기
+const FALLBACK_FLUSH_MS = 60000;
+
 export default function ActivityTracker() {
   const { supabase, session } = useSupabase();   // ⬅ session 직접 가져오기!!
-  const intervalRef = useRef<any>(null);
+  const socketRef = useRef<WebSocket | null>(null);
 
   useEffect(() => {
-    console.log("🔥 ActivityTracker 시작!");
-    console.log("현재 세션:", session);
-
     if (!session) {
       console.log("❌ 로그인 정보 없음");
       return;
     }
 
     const userId = session.user.id;
-    console.log("사용자:", userId);
+    let closed = false;
+    let pingTimer: any = null;
+    let fallbackTimer: any = null;
+    let tickTimer: any = null;
+    let pendingSeconds = 0;
+
+    const isActive = () => document.visibilityState === "visible";
+
+    const sendPing = () => {
+      const ws = socketRef.current;
+      if (ws && ws.readyState === WebSocket.OPEN) {
+        ws.send(JSON.stringify({ type: "ping", active: isActive() }));
+      }
+    };
+
+    // 🔁 WebSocket 연결 실패 시: 1초마다 보내지 않고 로컬에 모았다가 한 번에 전송
+    const flushFallback = async () => {
+      if (pendingSeconds <= 0) return;
+      const seconds = pendingSeconds;
+      pendingSeconds = 0;
+      try {
+        await axios.post(`${API_BASE}/attendance/log/batch`, {
+          user_id: userId,
+          records: [
+            {
+              date: new Date().toLocaleDateString("sv-SE", { timeZone: "Asia/Seoul" }),
+              seconds,
+            },
+          ],
+        });
+      } catch {
+        pendingSeconds += seconds;
+      }
+    };
 
-    // 1초마다 출석 저장
-    intervalRef.current = setInterval(() => {
-      sendTime(userId);
-    }, 1000);
+    const startFallback = () => {
+      if (tickTimer) return;
+      tickTimer = setInterval(() => {
+        if (isActive()) pendingSeconds += 1;
+      }, 1000);
+      fallbackTimer = setInterval(flushFallback, FALLBACK_FLUSH_MS);
+    };
+
+    const stopFallback = () => {
+      if (tickTimer) clearInterval(tickTimer);
+      if (fallbackTimer) clearInterval(fallbackTimer);
+      tickTimer = null;
+      fallbackTimer = null;
+      flushFallback();
+    };
+
+    const connect = () => {
+      // 브라우저 WebSocket 은 헤더를 못 붙이므로 access token 을 쿼리로 (서버가 검증 후 사용자 결정)
+      const wsUrl =
+        `${API_BASE.replace(/^http/, "ws")}/attendance/ws` +
+        `?user_id=${encodeURIComponent(userId)}&token=${encodeURIComponent(session.access_token)}`;
+      const ws = new WebSocket(wsUrl);
+      socketRef.current = ws;
+
+      ws.onopen = () => {
+        // 재연결되면 서버가 다시 집계하므로 로컬 집계는 멈추고 남은 값만 전송
+        stopFallback();
+        sendPing();
+        pingTimer = setInterval(sendPing, PING_INTERVAL_MS);
+      };
+      ws.onclose = () => {
+        if (pingTimer) clearInterval(pingTimer);
+        pingTimer = null;
+        if (closed) return;
+        startFallback();
+        // 서버 재시작 등으로 끊긴 경우 잠시 후 재연결
+        setTimeout(() => {
+          if (!closed) connect();
+        }, PING_INTERVAL_MS);
+      };
+    };
+
+    connect();
+    document.addEventListener("visibilitychange", sendPing);
 
     return () => {
-      if (intervalRef.current) clearInterval(intervalRef.current);
-      sendTime(userId);
+      closed = true;
+      document.removeEventListener("visibilitychange", sendPing);
+      if (pingTimer) clearInterval(pingTimer);
+      stopFallback();
+      socketRef.current?.close();
+      socketRef.current = null;
     };
   }, [session]);  // ⬅ 중요!!! session이 로딩된 뒤 작동
 
-  async function sendTime(userId: string) {
-    await axios.post("http://127.0.0.1:5000/attendance/log", {
-      user_id: userId,
-      seconds: 1,
-    });
-  }
-
   return null;
 }
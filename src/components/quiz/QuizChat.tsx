@@ -26,6 +26,65 @@ type QuizPayload = {
   quiz?: { id?: string; question?: string; choices?: string[] }[];
 };
 
+/* ---------------------------------------
+ * 퀴즈 생성 SSE 수신
+ * - event: question 이 올 때마다 onQuestion 호출 (첫 문제를 바로 보여줄 수 있음)
+ * - event: done 이면 전체 목록 반환, event: error 면 throw
+ * ------------------------------------- */
+async function streamQuiz(
+  url: string,
+  body: unknown,
+  onQuestion: (q: QuizItem, index: number) => void
+): Promise<QuizItem[]> {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    credentials: "include",
+    body: JSON.stringify(body),
+  });
+
+  if (!res.ok || !res.body) {
+    const data = await res.json().catch(() => null);
+    throw new Error(data?.error || "퀴즈 생성 실패");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  const list: QuizItem[] = [];
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep: number;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === "question") {
+        list.push(payload.question);
+        onQuestion(payload.question, payload.index);
+      } else if (event === "done") {
+        return (payload.quiz ?? list) as QuizItem[];
+      } else if (event === "error") {
+        throw new Error(payload?.error || "퀴즈 생성 실패");
+      }
+    }
+  }
+  return list;
+}
+
 export default function QuizChat() {
   const [messages, setMessages] = useState<any[]>([]);
   const [composer, setComposer] = useState("");
@@ -37,6 +96,9 @@ export default function QuizChat() {
 
   const [loading, setLoading] = useState(false);
 
+  // 스트리밍으로 아직 받는 중인 퀴즈 (다음 문제가 도착하기 전에 답을 내면 여기서 기다림)
+  const pendingQuizRef = useRef<Promise<QuizItem[]> | null>(null);
+
   const chatScrollRef = useRef<HTMLDivElement>(null);
   const endRef = useRef<HTMLDivElement>(null);
 
@@ -195,8 +257,13 @@ export default function QuizChat() {
     ]);
 
     // 5) 다음 문제 / 종료 처리
-    if (currentIndex + 1 < quizList.length) {
-      const nextQ = quizList[currentIndex + 1];
+    const list =
+      currentIndex + 1 >= quizList.length && pendingQuizRef.current
+        ? await pendingQuizRef.current.catch(() => quizList)
+        : quizList;
+
+    if (currentIndex + 1 < list.length) {
+      const nextQ = list[currentIndex + 1];
 
       // 다음 문제도 DB에 남겨야, 나중에 채팅 다시 열었을 때 보임
       const {
@@ -276,11 +343,40 @@ export default function QuizChat() {
       );
       const postData = await postRes.json();
 
-      const res = await fetch(`${BACKEND_URL}/api/quiz/from-url`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        credentials: "include",
-        body: JSON.stringify({
+      // 첫 문제는 DB 저장 후 화면 표시 (세션을 바꾸면 과거 메시지를 다시 읽으므로 저장이 먼저)
+      async function showFirst(q: QuizItem) {
+        await supabase.from("quiz_messages").insert({
+          session_id: newS,
+          run_id: newR,
+          user_id: user?.id,
+          role: "ai",
+          kind: "quiz",
+          payload: JSON.stringify({
+            question: q.question,
+            choices: q.choices ?? [],
+            question_id: q.id,
+          }),
+        });
+
+        setSessionId(newS);
+        setRunId(newR);
+        setCurrentIndex(0);
+        setMessages([
+          {
+            id: "q-1",
+            role: "ai",
+            kind: "quiz",
+            question: q.question,
+            options: q.choices ?? [],
+          },
+        ]);
+        setLoading(false);
+      }
+
+      // 첫 문제가 도착하면 나머지 문제를 기다리지 않고 바로 표시
+      const pending = streamQuiz(
+        `${BACKEND_URL}/api/quiz/from-url/stream`,
+        {
           session_id: newS,
           run_id: newR,
           user_id: user?.id,
@@ -288,44 +384,19 @@ export default function QuizChat() {
           week_id: weekId,
           mode,
           file_urls: postData?.file_urls || [],
-        }),
-      });
-
-      const data = await res.json();
-      if (!res.ok) throw new Error(data?.error || "퀴즈 생성 실패");
+        },
+        (q, index) => {
+          setQuizList((prev) => (index === 0 ? [q] : [...prev, q]));
+          if (index === 0) void showFirst(q);
+        }
+      );
+      pendingQuizRef.current = pending;
 
-      const list = (data?.quiz ?? []) as QuizItem[];
+      const list = await pending.finally(() => {
+        if (pendingQuizRef.current === pending) pendingQuizRef.current = null;
+      });
       if (!list.length) throw new Error("퀴즈가 비어 있습니다.");
-
-      setSessionId(newS);
-      setRunId(newR);
       setQuizList(list);
-      setCurrentIndex(0);
-
-      // 첫 문제 DB 저장
-      await supabase.from("quiz_messages").insert({
-        session_id: newS,
-        run_id: newR,
-        user_id: user?.id,
-        role: "ai",
-        kind: "quiz",
-        payload: JSON.stringify({
-          question: list[0].question,
-          choices: list[0].choices ?? [],
-          question_id: list[0].id,
-        }),
-      });
-
-      // 첫 문제 화면 표시
-      setMessages([
-        {
-          id: "q-1",
-          role: "ai",
-          kind: "quiz",
-          question: list[0].question,
-          options: list[0].choices ?? [],
-        },
-      ]);
     } finally {
       setLoading(false);
     }
@@ -368,11 +439,40 @@ export default function QuizChat() {
       );
       const postData = await postRes.json();
 
-      const res = await fetch(`${BACKEND_URL}/api/quiz/from-url`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        credentials: "include",
-        body: JSON.stringify({
+      // 새 런의 첫 문제 DB 저장 후 기존 대화 뒤에 붙이기
+      async function showFirst(q: QuizItem) {
+        await supabase.from("quiz_messages").insert({
+          session_id: sId,
+          run_id: rId,
+          user_id: user?.id,
+          role: "ai",
+          kind: "quiz",
+          payload: JSON.stringify({
+            question: q.question,
+            choices: q.choices ?? [],
+            question_id: q.id,
+          }),
+        });
+
+        setRunId(rId);
+        setCurrentIndex(0);
+        setMessages((prev) => [
+          ...prev,
+          {
+            id: `q-${Date.now()}`,
+            role: "ai",
+            kind: "quiz",
+            question: q.question,
+            options: q.choices ?? [],
+          },
+        ]);
+        setLoading(false);
+      }
+
+      // 첫 문제가 도착하면 나머지 문제를 기다리지 않고 바로 표시
+      const pending = streamQuiz(
+        `${BACKEND_URL}/api/quiz/from-url/stream`,
+        {
           session_id: sId,
           run_id: rId,
           user_id: user?.id,
@@ -380,44 +480,19 @@ export default function QuizChat() {
           week_id,
           mode,
           file_urls: postData?.file_urls || [],
-        }),
-      });
-
-      const data = await res.json();
-      if (!res.ok) throw new Error(data?.error || "퀴즈 생성 실패");
+        },
+        (q, index) => {
+          setQuizList((prev) => (index === 0 ? [q] : [...prev, q]));
+          if (index === 0) void showFirst(q);
+        }
+      );
+      pendingQuizRef.current = pending;
 
-      const list = (data?.quiz ?? []) as QuizItem[];
+      const list = await pending.finally(() => {
+        if (pendingQuizRef.current === pending) pendingQuizRef.current = null;
+      });
       if (!list.length) throw new Error("퀴즈가 비어 있습니다.");
-
-      setRunId(rId);
       setQuizList(list);
-      setCurrentIndex(0);
-
-      // 새 런의 첫 문제 DB 저장
-      await supabase.from("quiz_messages").insert({
-        session_id: sId,
-        run_id: rId,
-        user_id: user?.id,
-        role: "ai",
-        kind: "quiz",
-        payload: JSON.stringify({
-          question: list[0].question,
-          choices: list[0].choices ?? [],
-          question_id: list[0].id,
-        }),
-      });
-
-      // 기존 대화 뒤에 새 문제 붙이기
-      setMessages((prev) => [
-        ...prev,
-        {
-          id: `q-${Date.now()}`,
-          role: "ai",
-          kind: "quiz",
-          question: list[0].question,
-          options: list[0].choices ?? [],
-        },
-      ]);
     } finally {
       setLoading(false);
     }